@@ -1,17 +1,55 @@
 # api/main.py
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from starlette.routing import Match
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
+from typing import List, Literal
+import json
+import logging
+import time
 import sys, os
 
 # Add project root to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Import logic classes
-from src.logic import UserLogic, CategoryLogic, ArticleLogic, InteractionLogic, RecommendationLogic
+# Import logic classes (async variants run DB calls on a bounded thread pool)
+from src.async_logic import (
+    AsyncUserLogic, AsyncCategoryLogic, AsyncArticleLogic,
+    AsyncInteractionLogic, AsyncRecommendationLogic, AsyncTrendingLogic, warm_up
+)
+from src.cached_db import cache_stats, RECOMMENDATIONS_READ_LIMIT
+from src.db import close_backend
+from src.logic import duplicate_index, interaction_buffer, recommendation_sweeper
+from src.write_behind import BufferFull
+from src import metrics
+
+logger = logging.getLogger(__name__)
 
 # ----- APP Setup -----
-app = FastAPI(title="Personalized News Feed API", version="1.0")
+# Load indexes and open the storage connection before accepting traffic
+WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "1") == "1"
+
+@asynccontextmanager
+async def lifespan(app):
+    if WARM_UP_ON_STARTUP:
+        started = time.perf_counter()
+        try:
+            await warm_up()
+            logger.info("warm-up done in %.2fs", time.perf_counter() - started)
+        except Exception:
+            # Serve anyway; the first requests load whatever is missing
+            logger.exception("warm-up failed")
+    recommendation_sweeper.start()
+    yield
+    recommendation_sweeper.stop()
+    # Write out interactions that were acknowledged but not yet flushed
+    interaction_buffer.close()
+    duplicate_index.flush()
+    close_backend()
+
+app = FastAPI(title="Personalized News Feed API", version="1.0", lifespan=lifespan)
 
 # CORS configuration
 app.add_middleware(
@@ -22,12 +60,83 @@ app.add_middleware(
     allow_credentials=True
 )
 
+# ----- Instrumentation -----
+# Send the PROFILE_HEADER request header to get the request's timing
+# breakdown back in Server-Timing and X-Profile-Breakdown response headers
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "1") == "1"
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile")
+
+http_seconds = metrics.registry.histogram(
+    "newsfeed_http_request_duration_seconds", "Request latency by route", ("method", "route", "status")
+)
+http_in_flight = metrics.registry.gauge(
+    "newsfeed_http_requests_in_flight", "Requests being served", ("method", "route")
+)
+http_db_calls = metrics.registry.histogram(
+    "newsfeed_http_request_db_calls", "DB calls made while serving a request", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+buffer_pending = metrics.registry.gauge("newsfeed_interaction_buffer_pending", "Interactions waiting to be written")
+buffer_rows = metrics.registry.observed_counter(
+    "newsfeed_interaction_buffer_rows_total", "Interactions written or dropped", ("outcome",)
+)
+cache_events = metrics.registry.observed_counter(
+    "newsfeed_cache_events_total", "Read-through cache hits, misses, coalesced loads and evictions", ("cache", "event")
+)
+cache_size = metrics.registry.gauge("newsfeed_cache_entries", "Entries held by each read-through cache", ("cache",))
+recommendations_expired = metrics.registry.observed_counter(
+    "newsfeed_recommendations_expired_total", "Recommendations deleted by the retention sweeper"
+)
+
+def _collect():
+    buffer_pending.set(interaction_buffer.pending())
+    buffer_rows.set(interaction_buffer.flushed, outcome="flushed")
+    buffer_rows.set(interaction_buffer.dropped, outcome="dropped")
+    recommendations_expired.set(recommendation_sweeper.deleted)
+    for name, stats in cache_stats().items():
+        cache_size.set(stats.pop("size"), cache=name)
+        for event, value in stats.items():
+            cache_events.set(value, cache=name, event=event)
+
+metrics.registry.on_collect(_collect)
+
+def _route_template(request):
+    # Label by path template so /users/1 and /users/2 share a series
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    labels = {"method": request.method, "route": _route_template(request)}
+    http_in_flight.inc(**labels)
+    trace, token = metrics.start_trace()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        metrics.end_trace(token)
+        http_in_flight.dec(**labels)
+        http_seconds.observe(trace.elapsed(), status=status, **labels)
+        http_db_calls.observe(trace.count("db"), **labels)
+    if PROFILING_ENABLED and request.headers.get(PROFILE_HEADER):
+        response.headers["Server-Timing"] = trace.server_timing()
+        response.headers["X-Profile-Breakdown"] = json.dumps(trace.breakdown(), separators=(",", ":"))
+    return response
+
 # ----- Logic Instances -----
-user_logic = UserLogic()
-category_logic = CategoryLogic()
-article_logic = ArticleLogic()
-interaction_logic = InteractionLogic()
-recommendation_logic = RecommendationLogic()
+user_logic = AsyncUserLogic()
+category_logic = AsyncCategoryLogic()
+article_logic = AsyncArticleLogic()
+interaction_logic = AsyncInteractionLogic()
+recommendation_logic = AsyncRecommendationLogic()
+trending_logic = AsyncTrendingLogic()
+
+# Column views accepted by the fields= query parameter (see ARTICLE_VIEWS in src/db.py)
+ArticleFields = Literal["full", "summary", "id_category"]
 
 # ----- Data Models -----
 # Users
@@ -77,33 +186,40 @@ class RecommendationCreate(BaseModel):
     article_id: int
     score: float
 
+class RecommendationBatch(BaseModel):
+    # Either a list of user ids or the range [start_user, end_user)
+    user_ids: List[int] = None
+    start_user: int = None
+    end_user: int = None
+    top_n: int = 5
+
 # ------------------------
 # USERS CRUD
 # ------------------------
 @app.post("/users")
-def create_user(user: UserCreate):
-    res = user_logic.add_user(user.username, user.email, user.password)
+async def create_user(user: UserCreate):
+    res = await user_logic.add_user(user.username, user.email, user.password)
     if res.get("success"):
         return res
     raise HTTPException(status_code=400, detail=res.get("message"))
 
 @app.get("/users/{user_id}")
-def get_user(user_id: int):
-    res = user_logic.get_user(user_id)
+async def get_user(user_id: int):
+    res = await user_logic.get_user(user_id)
     if res.get("success"):
         return res
     raise HTTPException(status_code=404, detail=res.get("message"))
 
 @app.put("/users/{user_id}")
-def update_user(user_id: int, user: UserUpdate):
-    res = user_logic.update_user(user_id, user.username, user.email, user.password)
+async def update_user(user_id: int, user: UserUpdate):
+    res = await user_logic.update_user(user_id, user.username, user.email, user.password)
     if res.get("success"):
         return res
     raise HTTPException(status_code=400, detail=res.get("message"))
 
 @app.delete("/users/{user_id}")
-def delete_user(user_id: int):
-    res = user_logic.delete_user(user_id)
+async def delete_user(user_id: int):
+    res = await user_logic.delete_user(user_id)
     if res.get("success"):
         return res
     raise HTTPException(status_code=400, detail=res.get("message"))
@@ -112,29 +228,29 @@ def delete_user(user_id: int):
 # CATEGORIES CRUD
 # ------------------------
 @app.post("/categories")
-def create_category(category: CategoryCreate):
-    res = category_logic.add_category(category.name)
+async def create_category(category: CategoryCreate):
+    res = await category_logic.add_category(category.name)
     if res.get("success"):
         return res
     raise HTTPException(status_code=400, detail=res.get("message"))
 
 @app.get("/categories")
-def list_categories():
-    res = category_logic.list_categories()
+async def list_categories():
+    res = await category_logic.list_categories()
     if res.get("success"):
         return res
     raise HTTPException(status_code=404, detail=res.get("message"))
 
 @app.put("/categories/{category_id}")
-def update_category(category_id: int, category: CategoryUpdate):
-    res = category_logic.update_category(category_id, category.name)
+async def update_category(category_id: int, category: CategoryUpdate):
+    res = await category_logic.update_category(category_id, category.name)
     if res.get("success"):
         return res
     raise HTTPException(status_code=400, detail=res.get("message"))
 
 @app.delete("/categories/{category_id}")
-def delete_category(category_id: int):
-    res = category_logic.delete_category(category_id)
+async def delete_category(category_id: int):
+    res = await category_logic.delete_category(category_id)
     if res.get("success"):
         return res
     raise HTTPException(status_code=400, detail=res.get("message"))
@@ -143,8 +259,8 @@ def delete_category(category_id: int):
 # ARTICLES CRUD
 # ------------------------
 @app.post("/articles")
-def create_article(article: ArticleCreate):
-    res = article_logic.add_article(
+async def create_article(article: ArticleCreate):
+    res = await article_logic.add_article(
         article.title,
         article.content,
         article.source,
@@ -156,23 +272,71 @@ def create_article(article: ArticleCreate):
         return res
     raise HTTPException(status_code=400, detail=res.get("message"))
 
+@app.post("/articles/bulk")
+async def create_articles_bulk(request: Request, batch_size: int = Query(500, ge=1, le=5000)):
+    """
+    Ingest an NDJSON body (one ArticleCreate object per line) in batches of batch_size.
+    Rows are validated as they stream in; errors are reported per line
+    """
+    inserted, errors, batch = 0, [], []
+
+    async def flush():
+        nonlocal inserted
+        res = await article_logic.add_articles([row for _, row in batch])
+        inserted += res["inserted"]
+        errors.extend({"line": batch[e["index"]][0], "message": e["message"]} for e in res["errors"])
+        batch.clear()
+
+    line_no = 0
+    async for line in _iter_lines(request.stream()):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            article = ArticleCreate(**json.loads(line))
+        except (ValueError, TypeError) as exc:
+            errors.append({"line": line_no, "message": str(exc)})
+            continue
+        batch.append((line_no, article.dict()))
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    errors.sort(key=lambda e: e["line"])
+    return {"success": True, "inserted": inserted, "errors": errors}
+
+async def _iter_lines(chunks):
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
 @app.get("/articles")
-def read_articles():
-    res = article_logic.list_articles()
+async def read_articles(limit: int = Query(50, ge=1, le=500), cursor: str = None, stream: bool = False,
+                        fields: ArticleFields = "summary"):
+    # stream=true returns the whole catalog as NDJSON, read from the DB in chunks
+    if stream:
+        return StreamingResponse(article_logic.sync.stream_articles(fields=fields), media_type="application/x-ndjson")
+    res = await article_logic.list_articles_page(limit, cursor, fields)
     if res.get("success"):
         return res
-    raise HTTPException(status_code=404, detail=res.get("message"))
+    raise HTTPException(status_code=400, detail=res.get("message"))
 
 @app.put("/articles/{article_id}")
-def update_article(article_id: int, article: ArticleUpdate):
-    res = article_logic.update_article(article_id, **article.dict(exclude_none=True))
+async def update_article(article_id: int, article: ArticleUpdate):
+    res = await article_logic.update_article(article_id, **article.dict(exclude_none=True))
     if res.get("success"):
         return res
     raise HTTPException(status_code=400, detail=res.get("message"))
 
 @app.delete("/articles/{article_id}")
-def delete_article(article_id: int):
-    res = article_logic.delete_article(article_id)
+async def delete_article(article_id: int):
+    res = await article_logic.delete_article(article_id)
     if res.get("success"):
         return res
     raise HTTPException(status_code=400, detail=res.get("message"))
@@ -180,27 +344,31 @@ def delete_article(article_id: int):
 # ------------------------
 # USER INTERACTIONS
 # ------------------------
-@app.post("/interactions")
-def create_interaction(interaction: InteractionCreate):
-    res = interaction_logic.add_interaction(
-        interaction.user_id,
-        interaction.article_id,
-        interaction.interaction_type
-    )
+@app.post("/interactions", status_code=202)
+async def create_interaction(interaction: InteractionCreate):
+    # Queued for write-behind once the user and article are known to exist
+    try:
+        res = await interaction_logic.queue_interaction(
+            interaction.user_id,
+            interaction.article_id,
+            interaction.interaction_type
+        )
+    except BufferFull:
+        raise HTTPException(status_code=503, detail="Too many pending interactions", headers={"Retry-After": "1"})
     if res.get("success"):
         return res
     raise HTTPException(status_code=400, detail=res.get("message"))
 
 @app.get("/interactions/{user_id}")
-def get_user_interactions(user_id: int):
-    res = interaction_logic.get_interactions(user_id)
+async def get_user_interactions(user_id: int, fields: ArticleFields = "summary"):
+    res = await interaction_logic.get_interactions(user_id, fields)
     if res.get("success"):
         return res
     raise HTTPException(status_code=404, detail=res.get("message"))
 
 @app.delete("/interactions/")
-def delete_interaction(user_id: int, article_id: int):
-    res = interaction_logic.delete_interaction(user_id, article_id)
+async def delete_interaction(user_id: int, article_id: int):
+    res = await interaction_logic.delete_interaction(user_id, article_id)
     if res.get("success"):
         return res
     raise HTTPException(status_code=400, detail=res.get("message"))
@@ -209,26 +377,73 @@ def delete_interaction(user_id: int, article_id: int):
 # RECOMMENDATIONS
 # ------------------------
 @app.post("/recommendations")
-def create_recommendation(rec: RecommendationCreate):
-    res = recommendation_logic.add_recommendation(rec.user_id, rec.article_id, rec.score)
+async def create_recommendation(rec: RecommendationCreate):
+    res = await recommendation_logic.add_recommendation(rec.user_id, rec.article_id, rec.score)
     if res.get("success"):
         return res
     raise HTTPException(status_code=400, detail=res.get("message"))
 
 @app.get("/recommendations/{user_id}")
-def get_recommendations(user_id: int):
-    res = recommendation_logic.get_recommendations(user_id)
+async def get_recommendations(user_id: int, fields: ArticleFields = "summary",
+                              limit: int = Query(20, ge=1, le=RECOMMENDATIONS_READ_LIMIT)):
+    res = await recommendation_logic.get_recommendations(user_id, fields, limit)
     if res.get("success"):
         return res
     raise HTTPException(status_code=404, detail=res.get("message"))
 
 @app.get("/recommendations/generate/{user_id}")
-def generate_recommendations(user_id: int, top_n: int = 5):
-    res = recommendation_logic.generate_recommendations(user_id, top_n)
+async def generate_recommendations(user_id: int, top_n: int = 5):
+    res = await recommendation_logic.generate_recommendations(user_id, top_n)
     if res.get("success"):
         return {"success": True, "data": res.get("recommendations")}
     raise HTTPException(status_code=400, detail=res.get("message"))
 
+@app.post("/recommendations/generate")
+async def generate_recommendations_batch(batch: RecommendationBatch):
+    """
+    Generate recommendations for many users against one in-memory catalog.
+    Streams NDJSON, one {"user_id", "recommendations"} line per user, or
+    {"user_id", "error"} for a user that is unknown or failed
+    """
+    has_range = batch.start_user is not None or batch.end_user is not None
+    if (batch.user_ids is None) == (not has_range):
+        raise HTTPException(status_code=400, detail="Provide either user_ids or start_user/end_user")
+    return StreamingResponse(
+        recommendation_logic.sync.stream_generate(batch.user_ids, batch.start_user, batch.end_user, batch.top_n),
+        media_type="application/x-ndjson"
+    )
+
+# ------------------------
+# TRENDING
+# ------------------------
+@app.get("/trending")
+async def get_trending(window: str = "24h", limit: int = Query(20, ge=1, le=100), category_id: int = None):
+    res = await trending_logic.get_trending(window, limit, category_id)
+    if res.get("success"):
+        return res
+    raise HTTPException(status_code=400, detail=res.get("message"))
+
+@app.get("/trending/categories")
+async def get_trending_categories(window: str = "24h", limit: int = Query(20, ge=1, le=100)):
+    res = await trending_logic.get_trending_categories(window, limit)
+    if res.get("success"):
+        return res
+    raise HTTPException(status_code=400, detail=res.get("message"))
+
+# ------------------------
+# CACHE
+# ------------------------
+@app.get("/cache/stats")
+async def read_cache_stats():
+    return {"success": True, "data": cache_stats()}
+
+# ------------------------
+# METRICS
+# ------------------------
+@app.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 # ------------------------
 # RUN APP
 # ------------------------
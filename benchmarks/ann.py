@@ -0,0 +1,107 @@
+# benchmarks/ann.py
+"""
+Recall and throughput of approximate candidate search against exact ranking.
+
+    python -m benchmarks.ann --articles 1000000 --budget 10000,50000,200000 --output ann.json
+
+Vectorizes a synthetic catalog (see benchmarks/synthetic.py) and ranks one
+profile per sampled user both ways: exactly over every article, and as the
+recommender does from ANN_MIN_ARTICLES on (RankingEngine.candidates() with
+a posting budget, then score() on the candidates). recall@k is the share
+of the exact top k that the approximate path also returns.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run import measure, timed, _git_version
+from benchmarks.synthetic import generate
+from src.ranking import RankingEngine
+from src.scoring import top_n
+
+
+def run(args):
+    t0 = time.perf_counter()
+    tables = generate(
+        n_articles=args.articles, n_users=args.queries, n_categories=args.categories,
+        interactions_per_user=args.interactions_per_user, words_per_article=args.words,
+        skew=args.skew, seed=args.seed, topics=args.topics, topic_share=args.topic_share
+    )
+    generate_seconds = time.perf_counter() - t0
+
+    engine = RankingEngine()
+    setup = {"ranking_engine_load": timed(lambda: engine.load(tables["Articles"]))}
+
+    history = {}
+    for row in tables["User_Interactions"]:
+        history.setdefault(row["user_id"], []).append(row["article_id"])
+    queries = [q for q in (engine.profile(ids) for ids in history.values()) if q is not None]
+    n = len(queries)
+
+    exact = [{article_id for article_id, _ in engine.rank(q, args.k)} for q in queries]
+    scenarios = {"exact": measure(lambda i: engine.rank(queries[i % n], args.k), args.iterations)}
+
+    def approximate(query, budget):
+        return top_n(engine.score(query, engine.candidates(query, args.candidates, budget)), args.k)
+
+    for budget in args.budget:
+        hits = sum(
+            len({article_id for article_id, _ in approximate(q, budget)} & truth)
+            for q, truth in zip(queries, exact)
+        )
+        result = measure(lambda i: approximate(queries[i % n], budget), args.iterations)
+        result["recall_at_k"] = round(hits / max(1, sum(len(truth) for truth in exact)), 4)
+        scenarios[f"budget_{budget}"] = result
+
+    return {
+        "version": _git_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset": {
+            "articles": len(tables["Articles"]),
+            "queries": n,
+            "topics": args.topics,
+            "seed": args.seed,
+            "generate_seconds": round(generate_seconds, 3),
+        },
+        "k": args.k,
+        "candidates": args.candidates,
+        "setup": setup,
+        "scenarios": scenarios,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark approximate candidate search against exact ranking")
+    parser.add_argument("--articles", type=int, default=100000, help="e.g. 100000, 1000000")
+    parser.add_argument("--queries", type=int, default=200, help="users whose profiles are the queries")
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--interactions-per-user", type=int, default=20)
+    parser.add_argument("--words", type=int, default=60, help="words per article body")
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--topics", type=int, default=500, help="0 for unclustered text")
+    parser.add_argument("--topic-share", type=float, default=0.5, help="share of each article's words from its topic")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, default=200, help="articles re-scored exactly")
+    parser.add_argument(
+        "--budget", type=lambda s: [int(x) for x in s.split(",")], default=[10000, 20000, 50000, 100000, 200000],
+        help="postings read per query, comma-separated"
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+if __name__ == "__main__":
+    main()
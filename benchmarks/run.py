@@ -0,0 +1,183 @@
+# benchmarks/run.py
+"""
+Micro-benchmarks for the recommendation and list paths.
+
+    python -m benchmarks.run --articles 100000 --users 5000 --output bench.json
+
+Generates a synthetic dataset (see benchmarks/synthetic.py), loads it into
+a fresh SQLite database and reports latency percentiles, throughput and
+peak traced memory for each scenario as JSON, so runs of different
+versions can be compared number by number.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Every run gets its own database and index files
+_workdir = tempfile.mkdtemp()
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(_workdir, "bench.db")
+os.environ.setdefault("DEDUPE_INDEX_PATH", os.path.join(_workdir, "dedupe_index.npz"))
+
+from benchmarks.synthetic import generate, seed
+
+
+# ------------------------
+# MEASUREMENT
+# ------------------------
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def measure(fn, iterations, memory_iterations=20):
+    """
+    Time fn() iterations times, then trace peak memory over a shorter run
+    """
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    for i in range(min(memory_iterations, iterations)):
+        fn(i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p90_ms": round(_percentile(latencies, 90), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3),
+        "ops_per_sec": round(iterations / elapsed, 1) if elapsed else None,
+        "peak_traced_mb": round(peak / 2 ** 20, 3),
+    }
+
+def timed(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(seconds, 3), "peak_traced_mb": round(peak / 2 ** 20, 3)}
+
+
+# ------------------------
+# SCENARIOS
+# ------------------------
+def run(args):
+    from src import db, logic
+    from src.cached_db import cache_stats, CACHES
+
+    t0 = time.perf_counter()
+    tables = generate(
+        n_articles=args.articles, n_users=args.users, n_categories=args.categories,
+        interactions_per_user=args.interactions_per_user, words_per_article=args.words,
+        skew=args.skew, seed=args.seed
+    )
+    generate_seconds = time.perf_counter() - t0
+
+    setup = {
+        "seed_database": timed(lambda: seed(db.get_backend(), tables)),
+        "catalog_load": timed(logic.get_article_catalog),
+        "ranking_engine_load": timed(logic.get_ranking_engine),
+        "duplicate_index_load": timed(logic.get_duplicate_index),
+        "item_similarity_load": timed(logic.get_item_similarity),
+    }
+
+    rng = random.Random(args.seed)
+    active_users = sorted({row["user_id"] for row in tables["User_Interactions"]})
+    user_sequence = [rng.choice(active_users) for _ in range(args.iterations)]
+    recommender = logic.RecommendationLogic()
+    articles = logic.ArticleLogic()
+    categories = logic.CategoryLogic()
+
+    scenarios = {}
+    # First call per user also backfills the stored profile
+    scenarios["generate_recommendations"] = measure(
+        lambda i: recommender.generate_recommendations(user_sequence[i], args.top_n), args.iterations
+    )
+
+    # Walk the catalog page by page, starting over at the end
+    cursor = [None]
+    def page(i):
+        cursor[0] = articles.list_articles_page(50, cursor[0])["next_cursor"]
+    for cache in CACHES:
+        cache.invalidate()
+    scenarios["list_articles_page"] = measure(page, args.iterations)
+
+    stream_iterations = max(1, min(5, args.iterations // 100))
+    scenarios["stream_articles"] = measure(
+        lambda i: sum(1 for _ in articles.stream_articles()), stream_iterations, memory_iterations=1
+    )
+    scenarios["list_categories"] = measure(lambda i: categories.list_categories(), args.iterations)
+    scenarios["get_recommendations"] = measure(
+        lambda i: recommender.get_recommendations(user_sequence[i], "summary"), args.iterations
+    )
+
+    return {
+        "version": _git_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset": {
+            "articles": len(tables["Articles"]),
+            "users": len(tables["Users"]),
+            "categories": len(tables["Categories"]),
+            "interactions": len(tables["User_Interactions"]),
+            "skew": args.skew,
+            "seed": args.seed,
+            "generate_seconds": round(generate_seconds, 3),
+        },
+        "setup": setup,
+        "scenarios": scenarios,
+        "cache": cache_stats(),
+    }
+
+def _git_version():
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation and list paths")
+    parser.add_argument("--articles", type=int, default=10000, help="e.g. 10000, 100000, 1000000")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--interactions-per-user", type=int, default=20, help="mean; Zipf-skewed per user")
+    parser.add_argument("--words", type=int, default=60, help="words per article body")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for popularity and activity")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/synthetic.py
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+
+# ------------------------
+# DATASET GENERATION
+# ------------------------
+def _zipf_weights(n, skew):
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+def generate(n_articles=10000, n_users=1000, n_categories=20, interactions_per_user=20,
+             words_per_article=60, vocabulary=20000, skew=1.1, seed=0, topics=0, topic_share=0.5):
+    """
+    Build synthetic Users / Categories / Articles / User_Interactions tables.
+    Word, category, article popularity and per-user activity all follow
+    Zipf(skew) distributions, so a few users and articles dominate like
+    in real traffic. With topics, each article also belongs to one of that
+    many topics and topic_share of its words come from the topic's own
+    word ranking, so similar articles form clusters as real news does.
+    Returns a dict of table name -> list of rows
+    """
+    rng = np.random.default_rng(seed)
+    now = datetime.now(timezone.utc)
+
+    words = np.array([f"w{i}" for i in range(vocabulary)])
+    word_p = _zipf_weights(vocabulary, skew)
+    category_p = _zipf_weights(n_categories, skew)
+
+    categories = [{"category_id": c + 1, "name": f"category-{c + 1}"} for c in range(n_categories)]
+    users = [{"user_id": u + 1, "username": f"user{u + 1}"} for u in range(n_users)]
+
+    article_categories = rng.choice(n_categories, n_articles, p=category_p) + 1
+    ages = rng.uniform(0, 365 * 86400, n_articles)
+    if topics:
+        # A topic shifts the Zipf ranking so its common words differ from other topics'
+        article_topics = rng.choice(topics, n_articles, p=_zipf_weights(topics, skew))
+        topic_shift = rng.integers(1, vocabulary, topics)
+    articles = []
+    for start in range(0, n_articles, 10000):
+        stop = min(start + 10000, n_articles)
+        text = rng.choice(vocabulary, (stop - start, words_per_article), p=word_p)
+        if topics:
+            topical = rng.random(text.shape) < topic_share
+            shift = topic_shift[article_topics[start:stop]][:, None]
+            text = np.where(topical, (text + shift) % vocabulary, text)
+        for i in range(start, stop):
+            tokens = words[text[i - start]]
+            articles.append({
+                "article_id": i + 1,
+                "title": " ".join(tokens[:8]),
+                "content": " ".join(tokens),
+                "source": "synthetic",
+                "url": f"https://example.com/{i + 1}",
+                "category_id": int(article_categories[i]),
+                "published_at": (now - timedelta(seconds=float(ages[i]))).isoformat(),
+            })
+
+    # Heavy readers and popular articles: both counts are Zipf-distributed
+    activity = _zipf_weights(n_users, skew)
+    counts = rng.multinomial(n_users * interactions_per_user, activity)
+    popularity = _zipf_weights(n_articles, skew)[rng.permutation(n_articles)]
+    types = np.array(["click", "click", "click", "like", "share", "bookmark", "dislike"])
+    interactions = []
+    interaction_id = 0
+    for user, count in zip(users, counts.tolist()):
+        if not count:
+            continue
+        picks = rng.choice(n_articles, count, p=popularity) + 1
+        kinds = rng.choice(types, count)
+        times = rng.uniform(0, 180 * 86400, count)
+        for article_id, kind, age in zip(picks.tolist(), kinds.tolist(), times.tolist()):
+            interaction_id += 1
+            interactions.append({
+                "interaction_id": interaction_id,
+                "user_id": user["user_id"],
+                "article_id": article_id,
+                "interaction_type": kind,
+                "interaction_time": (now - timedelta(seconds=age)).isoformat(),
+            })
+
+    return {
+        "Users": users,
+        "Categories": categories,
+        "Articles": articles,
+        "User_Interactions": interactions,
+    }
+
+
+# ------------------------
+# SEEDING
+# ------------------------
+def seed(backend, tables):
+    """
+    Bulk-load generated tables into a storage backend that supports
+    bulk_load (the SQLite backend), parents before children
+    """
+    for table in ("Categories", "Users", "Articles", "User_Interactions"):
+        backend.bulk_load(table, tables[table])
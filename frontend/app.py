@@ -104,8 +104,10 @@ elif menu == "Articles":
             st.json(res.json())
 
     elif action == "List":
+        limit = st.slider("Page Size", 1, 500, 50)
+        cursor = st.text_input("Cursor (optional, from next_cursor)")
         if st.button("Get Articles"):
-            res = requests.get(f"{API_URL}/articles")
+            res = requests.get(f"{API_URL}/articles", params={"limit": limit, "cursor": cursor or None})
             st.json(res.json())
 
     elif action == "Update":
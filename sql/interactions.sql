@@ -0,0 +1,4 @@
+-- sql/interactions.sql
+-- Index behind get_interactions_since(), which seeds the trending counters
+
+create index if not exists interactions_time_idx on "User_Interactions" (interaction_time);
@@ -0,0 +1,96 @@
+-- sql/recommendations.sql
+-- One row per (user, article), a bulk replace used by upsert_recommendations()
+-- and the bounded delete behind the retention sweeper
+
+-- Safe to run again: keep only the newest row of any duplicated
+-- (user, article) pair, then add the constraint if it is missing
+delete from "Recommendations" r
+using "Recommendations" newer
+where newer.user_id = r.user_id
+  and newer.article_id = r.article_id
+  and (coalesce(newer.recommended_at, '-infinity'), newer.recommendation_id)
+    > (coalesce(r.recommended_at, '-infinity'), r.recommendation_id);
+
+do $$
+begin
+    if not exists (
+        select 1 from pg_constraint where conname = 'recommendations_user_article_key'
+    ) then
+        alter table "Recommendations"
+            add constraint recommendations_user_article_key unique (user_id, article_id);
+    end if;
+end
+$$;
+
+create or replace function replace_recommendations(p_user_id bigint, p_rows jsonb)
+returns setof "Recommendations"
+language sql
+as $$
+    with fresh as (
+        select (r->>'article_id')::bigint as article_id,
+               (r->>'score')::float8 as score
+        from jsonb_array_elements(p_rows) as r
+    ),
+    stale as (
+        delete from "Recommendations" rec
+        where rec.user_id = p_user_id
+          and rec.article_id not in (select article_id from fresh)
+    )
+    insert into "Recommendations" (user_id, article_id, score, recommended_at)
+    select p_user_id, article_id, score, now() from fresh
+    on conflict (user_id, article_id)
+    do update set score = excluded.score, recommended_at = excluded.recommended_at
+    returning *;
+$$;
+
+create or replace function replace_recommendations_bulk(p_rows jsonb)
+returns setof "Recommendations"
+language sql
+as $$
+    with fresh as (
+        select (r->>'user_id')::bigint as user_id,
+               (r->>'article_id')::bigint as article_id,
+               (r->>'score')::float8 as score
+        from jsonb_array_elements(p_rows) as r
+    ),
+    stale as (
+        delete from "Recommendations" rec
+        where rec.user_id in (select user_id from fresh)
+          and (rec.user_id, rec.article_id) not in (select user_id, article_id from fresh)
+    )
+    insert into "Recommendations" (user_id, article_id, score, recommended_at)
+    select user_id, article_id, score, now() from fresh
+    on conflict (user_id, article_id)
+    do update set score = excluded.score, recommended_at = excluded.recommended_at
+    returning *;
+$$;
+
+-- Reads return the newest generation (rows sharing the latest recommended_at)
+-- best first; the second index serves the retention sweep by age
+create index if not exists recommendations_user_latest_idx
+    on "Recommendations" (user_id, recommended_at desc, score desc);
+create index if not exists recommendations_recommended_at_idx
+    on "Recommendations" (recommended_at);
+
+-- Delete up to p_limit rows superseded by a newer generation of the same
+-- user or recommended before p_before; returns the number deleted
+create or replace function expire_recommendations(p_before timestamptz, p_limit int)
+returns bigint
+language sql
+as $$
+    with expired as (
+        select r.recommendation_id
+        from "Recommendations" r
+        where r.recommended_at < p_before
+           or r.recommended_at < (
+               select max(l.recommended_at) from "Recommendations" l where l.user_id = r.user_id
+           )
+        limit p_limit
+    ),
+    deleted as (
+        delete from "Recommendations"
+        where recommendation_id in (select recommendation_id from expired)
+        returning 1
+    )
+    select count(*) from deleted;
+$$;
@@ -0,0 +1,13 @@
+-- sql/user_profiles.sql
+-- Persisted interest profile per user, maintained by ProfileLogic
+
+create table if not exists "User_Profiles" (
+    user_id bigint primary key references "Users" (user_id) on delete cascade,
+    category_weights jsonb not null default '{}'::jsonb,
+    term_weights jsonb not null default '{}'::jsonb,
+    updated_at timestamptz not null default now(),
+    -- Bumped on every write; updates only apply to the version they read
+    version bigint not null default 0
+);
+
+alter table "User_Profiles" add column if not exists version bigint not null default 0;
@@ -0,0 +1,327 @@
+# src/aggregator.py
+"""
+News source aggregator.
+
+    python -m src.aggregator --once
+    python -m src.aggregator --interval 300
+
+Polls the RSS/Atom/JSON feeds listed in NEWS_FEEDS_FILE concurrently over a
+pooled keep-alive client, sends ETag / If-Modified-Since so unchanged feeds
+answer 304, rate-limits requests per host and ingests new entries through
+ArticleLogic.add_articles in batches.
+
+Feed file format:
+    [{"url": "https://example.com/rss", "category_id": 1, "source": "Example"}]
+"""
+import argparse
+import asyncio
+import html
+import json
+import os
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FEEDS_FILE = os.getenv("NEWS_FEEDS_FILE", "feeds.json")
+STATE_FILE = os.getenv("FEED_STATE_FILE", "feed_state.json")
+SEEN_PER_FEED = 1000     # entry urls remembered per feed
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_CONTENT = "{http://purl.org/rss/1.0/modules/content/}encoded"
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+# ------------------------
+# RATE LIMITING
+# ------------------------
+class HostRateLimiter:
+    """
+    Spaces requests to the same host at least 1 / rate seconds apart
+    """
+
+    def __init__(self, rate_per_sec=1.0):
+        self.interval = 1.0 / rate_per_sec
+        self._next = {}     # host -> earliest start time of its next request
+        self._locks = {}
+
+    async def wait(self, host):
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, now))
+            self._next[host] = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+# ------------------------
+# PARSING
+# ------------------------
+def parse_feed(body, content_type=""):
+    """
+    Parse an RSS, Atom or JSON Feed document into a list of raw entry dicts
+    """
+    text = body.decode("utf-8", errors="replace") if isinstance(body, bytes) else body
+    if "json" in content_type or text.lstrip().startswith("{"):
+        return [
+            {
+                "title": item.get("title"),
+                "content": item.get("content_html") or item.get("content_text") or item.get("summary"),
+                "url": item.get("url") or item.get("external_url"),
+                "published_at": item.get("date_published") or item.get("date_modified"),
+            }
+            for item in json.loads(text).get("items", [])
+        ]
+
+    root = ET.fromstring(body if isinstance(body, bytes) else body.encode())
+    if root.tag == f"{_ATOM}feed":
+        entries = []
+        for entry in root.iter(f"{_ATOM}entry"):
+            link = entry.find(f"{_ATOM}link[@rel='alternate']")
+            if link is None:
+                link = entry.find(f"{_ATOM}link")
+            entries.append({
+                "title": entry.findtext(f"{_ATOM}title"),
+                "content": entry.findtext(f"{_ATOM}content") or entry.findtext(f"{_ATOM}summary"),
+                "url": link.get("href") if link is not None else None,
+                "published_at": entry.findtext(f"{_ATOM}published") or entry.findtext(f"{_ATOM}updated"),
+            })
+        return entries
+
+    return [
+        {
+            "title": item.findtext("title"),
+            "content": item.findtext(_CONTENT) or item.findtext("description"),
+            "url": item.findtext("link"),
+            "published_at": item.findtext("pubDate"),
+        }
+        for item in root.iter("item")
+    ]
+
+def normalize_entry(entry, feed):
+    """
+    Turn a raw entry into an Articles row, or None if it lacks title or content
+    """
+    title = _clean(entry.get("title"))
+    content = _clean(entry.get("content")) or title
+    if not title or not content:
+        return None
+    return {
+        "title": title,
+        "content": content,
+        "source": feed.get("source") or urlsplit(feed["url"]).hostname,
+        "url": (entry.get("url") or "").strip() or None,
+        "category_id": feed.get("category_id"),
+        "published_at": _parse_date(entry.get("published_at")),
+    }
+
+def _clean(value):
+    if not value:
+        return ""
+    return _SPACE_RE.sub(" ", html.unescape(_TAG_RE.sub(" ", value))).strip()
+
+def _parse_date(value):
+    if value:
+        try:
+            parsed = parsedate_to_datetime(value)     # RSS (RFC 822)
+        except (TypeError, ValueError):
+            try:
+                parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+            except ValueError:
+                parsed = None
+        if parsed is not None:
+            return (parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).isoformat()
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ------------------------
+# AGGREGATOR
+# ------------------------
+class FeedAggregator:
+    """
+    Polls a list of feeds and ingests their new entries.
+    ingest(rows) defaults to ArticleLogic().add_articles and client to a
+    pooled httpx.AsyncClient; both can be swapped, e.g. to run against a
+    local stand-in server.
+    """
+
+    def __init__(self, feeds, state_path=STATE_FILE, rate_per_host=1.0, concurrency=10,
+                 batch_size=200, client=None, ingest=None):
+        self.feeds = feeds
+        self.state_path = state_path
+        self.batch_size = batch_size
+        self.limiter = HostRateLimiter(rate_per_host)
+        self.concurrency = concurrency
+        self._semaphore = None
+        self._client = client
+        self._ingest = ingest
+        self.state = self._load_state()   # feed url -> {etag, last_modified, seen}
+
+    async def poll_once(self):
+        """
+        Poll every feed once and ingest new entries; returns a summary dict
+        """
+        # Created here so it binds to the running event loop
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        owns_client = self._client is None
+        client = self._client or _make_client()
+        try:
+            results = await asyncio.gather(
+                *(self._poll_feed(client, feed) for feed in self.feeds), return_exceptions=True
+            )
+        finally:
+            if owns_client:
+                await client.aclose()
+
+        summary = {"feeds": len(self.feeds), "not_modified": 0, "failed": 0, "entries": 0,
+                   "inserted": 0, "errors": 0}
+        polled, rows = [], []
+        for feed, result in zip(self.feeds, results):
+            if isinstance(result, Exception):
+                summary["failed"] += 1
+                print(f"feed {feed['url']} failed: {result}", flush=True)
+            elif result is None:
+                summary["not_modified"] += 1
+            else:
+                polled.append((feed, *result))
+                rows.extend((len(polled) - 1, row) for row in result[0])
+        summary["entries"] = len(rows)
+
+        # A feed's validators and seen entries are only committed once all of
+        # its rows are stored, so a failed insert is fetched and retried next round
+        unstored = set()
+        for i in range(0, len(rows), self.batch_size):
+            batch = rows[i:i + self.batch_size]
+            try:
+                res = await self._run_ingest([row for _, row in batch])
+            except Exception as exc:
+                print(f"ingest of {len(batch)} entries failed: {exc}", flush=True)
+                summary["errors"] += len(batch)
+                unstored.update(owner for owner, _ in batch)
+                continue
+            summary["inserted"] += res.get("inserted", 0)
+            summary["errors"] += len(res.get("errors", []))
+            unstored.update(batch[e["index"]][0] for e in res.get("errors", []) if e.get("retryable"))
+
+        committed = False
+        for owner, (feed, feed_rows, validators) in enumerate(polled):
+            if owner in unstored:
+                continue
+            state = self.state.setdefault(feed["url"], {})
+            state.update(validators)
+            state["seen"] = (state.get("seen", []) + [r["url"] or r["title"] for r in feed_rows])[-SEEN_PER_FEED:]
+            committed = True
+        if committed:
+            self._save_state()
+        return summary
+
+    async def run_forever(self, interval=300):
+        # One client for every round keeps connections to each host alive
+        if self._client is None:
+            self._client = _make_client()
+        while True:
+            started = time.monotonic()
+            print(json.dumps(await self.poll_once()), flush=True)
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    # ----- internal -----
+    async def _poll_feed(self, client, feed):
+        """
+        Return (unseen normalized rows, validators) for the feed, or None
+        when it answered 304. Nothing is written to its state here
+        """
+        url = feed["url"]
+        state = self.state.get(url, {})
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
+        # Wait out the host's rate limit before taking a concurrency slot
+        await self.limiter.wait(urlsplit(url).hostname)
+        async with self._semaphore:
+            response = await client.get(url, headers=headers)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+
+        entries = parse_feed(response.content, response.headers.get("content-type", ""))
+        seen = set(state.get("seen", []))
+        rows = []
+        for entry in entries:
+            row = normalize_entry(entry, feed)
+            key = row and (row["url"] or row["title"])
+            if row is None or key in seen:
+                continue
+            seen.add(key)
+            rows.append(row)
+        return rows, {"etag": response.headers.get("etag"),
+                      "last_modified": response.headers.get("last-modified")}
+
+    async def _run_ingest(self, rows):
+        if self._ingest is not None:
+            result = self._ingest(rows)
+            return await result if asyncio.iscoroutine(result) else result
+        # Imported here so the aggregator can run against a stand-in ingest without a DB
+        from src.async_db import run
+        from src.logic import ArticleLogic
+        return await run(ArticleLogic().add_articles, rows)
+
+    def _load_state(self):
+        if self.state_path and os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.state_path)
+
+
+def _make_client():
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(15.0),
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        follow_redirects=True,
+        headers={"User-Agent": "PersonalNewsFeed/1.0"},
+    )
+
+def load_feeds(path=FEEDS_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poll news feeds and ingest new articles")
+    parser.add_argument("--feeds", default=FEEDS_FILE, help="JSON list of feeds")
+    parser.add_argument("--once", action="store_true", help="poll every feed once and exit")
+    parser.add_argument("--interval", type=float, default=300, help="seconds between polls")
+    parser.add_argument("--rate", type=float, default=1.0, help="requests per second per host")
+    parser.add_argument("--concurrency", type=int, default=10, help="feeds fetched at once")
+    parser.add_argument("--batch-size", type=int, default=200, help="articles per bulk insert")
+    args = parser.parse_args(argv)
+
+    aggregator = FeedAggregator(
+        load_feeds(args.feeds), rate_per_host=args.rate,
+        concurrency=args.concurrency, batch_size=args.batch_size
+    )
+    if args.once:
+        print(json.dumps(asyncio.run(aggregator.poll_once())))
+    else:
+        asyncio.run(aggregator.run_forever(args.interval))
+
+if __name__ == "__main__":
+    main()
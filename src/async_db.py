@@ -0,0 +1,47 @@
+# src/async_db.py
+import asyncio
+import contextvars
+import functools
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import cached_db, db
+
+# Both storage backends are blocking, so async callers run queries on a bounded
+# pool. Its size caps how many queries one worker has in flight at once.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "16"))
+executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="db")
+
+async def run(fn, *args, **kwargs):
+    """
+    Run a blocking call on the DB pool and await its result
+    """
+    loop = asyncio.get_running_loop()
+    # Carry the caller's context so DB calls land in its request trace
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(context.run, fn, *args, **kwargs))
+
+def _to_async(name):
+    # The cached_db version when there is one, so async reads share its
+    # caches and async writes invalidate them
+    fn = getattr(cached_db, name, None) or getattr(db, name)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run(fn, *args, **kwargs)
+    return wrapper
+
+# Only the calls the async logic makes; everything else runs inside a
+# sync logic method on the pool
+# ------------------------
+# USER INTERACTIONS
+# ------------------------
+get_user_interacted_article_ids = _to_async("get_user_interacted_article_ids")
+
+# ------------------------
+# USER PROFILES
+# ------------------------
+get_user_profile = _to_async("get_user_profile")
@@ -0,0 +1,97 @@
+# src/async_logic.py
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import async_db
+from src.async_db import run
+from src.cached_db import get_all_categories
+from src.logic import (
+    UserLogic, CategoryLogic, ArticleLogic, InteractionLogic, ProfileLogic, RecommendationLogic, TrendingLogic,
+    get_article_catalog, get_ranking_engine, get_duplicate_index, get_item_similarity, get_trending
+)
+
+# ------------------------
+# STARTUP
+# ------------------------
+async def warm_up():
+    """
+    Connect to storage, prime the categories cache and load the in-memory
+    indexes side by side, so no request pays for a cold worker
+    """
+    await asyncio.gather(
+        run(get_all_categories),
+        run(get_article_catalog),
+        run(get_ranking_engine),
+        run(get_duplicate_index),
+        run(get_item_similarity),
+        run(get_trending),
+    )
+
+# ------------------------
+# ASYNC WRAPPERS
+# ------------------------
+class _AsyncLogic:
+    """
+    Expose every method of a sync logic class as a coroutine that runs
+    on the bounded DB pool
+    """
+    sync_class = None
+
+    def __init__(self):
+        self.sync = self.sync_class()
+
+    def __getattr__(self, name):
+        method = getattr(self.sync, name)
+
+        async def call(*args, **kwargs):
+            return await run(method, *args, **kwargs)
+        return call
+
+
+class AsyncUserLogic(_AsyncLogic):
+    sync_class = UserLogic
+
+
+class AsyncCategoryLogic(_AsyncLogic):
+    sync_class = CategoryLogic
+
+
+class AsyncArticleLogic(_AsyncLogic):
+    sync_class = ArticleLogic
+
+
+class AsyncInteractionLogic(_AsyncLogic):
+    sync_class = InteractionLogic
+
+
+class AsyncTrendingLogic(_AsyncLogic):
+    sync_class = TrendingLogic
+
+
+class AsyncProfileLogic(_AsyncLogic):
+    sync_class = ProfileLogic
+
+    async def get_profile(self, user_id):
+        rows = (await async_db.get_user_profile(user_id)).data
+        return await run(self.sync.from_stored, user_id, rows)
+
+
+# ------------------------
+# RECOMMENDATIONS
+# ------------------------
+class AsyncRecommendationLogic(_AsyncLogic):
+    sync_class = RecommendationLogic
+
+    async def generate_recommendations(self, user_id, top_n=5):
+        # The profile, the interactions and (on a cold worker) the
+        # in-memory indexes do not depend on each other, so fetch them together
+        profile, interacted, _, _ = await asyncio.gather(
+            AsyncProfileLogic().get_profile(user_id),
+            async_db.get_user_interacted_article_ids(user_id),
+            run(get_article_catalog),
+            run(get_ranking_engine),
+        )
+        return await run(self.sync.recommend, user_id, profile, interacted.data or [], top_n)
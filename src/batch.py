@@ -0,0 +1,137 @@
+# src/batch.py
+"""
+Offline recommendation precompute for every user.
+
+    python -m src.batch --start-user 1 --end-user 500000 --workers 8
+
+The article catalog is loaded once, users are streamed in chunks, each
+chunk is ranked on a process pool and the results are bulk-written into
+Recommendations. Run one process per user_id range to shard across nodes.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import iter_user_ids, insert_user_profiles, upsert_recommendations_bulk
+from src.logic import (
+    ProfileLogic, RecommendationLogic, get_article_catalog, get_ranking_engine, get_duplicate_index,
+    get_item_similarity, get_trending, cf_seeds, stored_article_ids
+)
+
+
+# ------------------------
+# WORKERS
+# ------------------------
+def _init_worker():
+    # Forked workers inherit the parent's loaded indexes; spawned ones load their own
+    get_article_catalog()
+    get_ranking_engine()
+    get_duplicate_index()
+    get_item_similarity()
+    get_trending()
+
+def rank_users(jobs, top_n):
+    """
+    Rank a list of (user_id, UserProfile or None, interaction rows) jobs
+    into Recommendations rows; users without a profile get cold_start()'s
+    picks, as generate_for_users() gives them
+    """
+    recommender = RecommendationLogic()
+    rows = []
+    for user_id, profile, interactions in jobs:
+        interacted_article_ids = {row["article_id"] for row in interactions}
+        if profile is None or profile.is_empty():
+            ranked = recommender.cold_start(interacted_article_ids, top_n, details=False)
+        else:
+            ranked = recommender.rank(
+                profile, interacted_article_ids, top_n, details=False, seeds=cf_seeds(interactions)
+            )
+        for article in ranked:
+            rows.append({
+                "user_id": user_id,
+                "article_id": article["article_id"],
+                "score": article["score"]
+            })
+    return rows
+
+
+# ------------------------
+# DRIVER
+# ------------------------
+def prepare_chunk(user_ids):
+    """
+    Fetch one chunk's profiles and interactions in two queries.
+    Returns (jobs, newly built profile rows)
+    """
+    profiles, history, built = ProfileLogic().get_profiles(user_ids)
+    jobs = [(user_id, profiles.get(user_id), history.get(user_id, [])) for user_id in user_ids]
+    return jobs, built
+
+def run(start_user=None, end_user=None, chunk_size=500, workers=None, top_n=10):
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    catalog = get_article_catalog()
+    get_ranking_engine()
+    get_duplicate_index()
+    get_item_similarity()
+    get_trending()
+    print(f"loaded {len(catalog)} articles in {time.perf_counter() - started:.1f}s", flush=True)
+
+    users = written = 0
+    pending = []
+
+    def drain():
+        nonlocal users, written
+        n_users, future = pending.pop(0)
+        rows = future.result()
+        if rows:
+            # Workers rank against the catalog as loaded; skip articles deleted since
+            stored = stored_article_ids(row["article_id"] for row in rows)
+            rows = [row for row in rows if row["article_id"] in stored]
+        if rows:
+            upsert_recommendations_bulk(rows)
+        users += n_users
+        written += len(rows)
+        elapsed = time.perf_counter() - started
+        print(f"{users} users, {written} recommendations, {users / elapsed:.1f} users/sec", flush=True)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for user_ids in iter_user_ids(start_user, end_user, chunk_size):
+            jobs, built = prepare_chunk(user_ids)
+            if built:
+                insert_user_profiles(built)
+            pending.append((len(user_ids), pool.submit(rank_users, jobs, top_n)))
+            # Bound the number of chunks held in memory
+            while len(pending) > 2 * workers:
+                drain()
+        while pending:
+            drain()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "users": users,
+        "recommendations": written,
+        "seconds": round(elapsed, 3),
+        "users_per_sec": round(users / elapsed, 1) if elapsed else None,
+        "start_user": start_user,
+        "end_user": end_user,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute recommendations for all users")
+    parser.add_argument("--start-user", type=int, help="first user_id of this shard (inclusive)")
+    parser.add_argument("--end-user", type=int, help="last user_id of this shard (exclusive)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="users fetched per query")
+    parser.add_argument("--workers", type=int, default=None, help="ranking processes (default: CPU count)")
+    parser.add_argument("--top-n", type=int, default=10, help="recommendations per user")
+    args = parser.parse_args(argv)
+    summary = run(args.start_user, args.end_user, args.chunk_size, args.workers, args.top_n)
+    print(json.dumps(summary))
+
+if __name__ == "__main__":
+    main()
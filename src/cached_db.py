@@ -0,0 +1,140 @@
+# src/cached_db.py
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import db
+from src.cache import TTLCache
+
+# ------------------------
+# CACHES
+# ------------------------
+# Categories almost never change; the catalog changes on ingest and
+# recommendations on every generate call, hence the different TTLs
+categories_cache = TTLCache("categories", ttl=float(os.getenv("CACHE_TTL_CATEGORIES", "3600")), maxsize=16)
+articles_cache = TTLCache("articles", ttl=float(os.getenv("CACHE_TTL_ARTICLES", "300")), maxsize=256)
+recommendations_cache = TTLCache(
+    "recommendations", ttl=float(os.getenv("CACHE_TTL_RECOMMENDATIONS", "60")), maxsize=10000
+)
+
+# Whether a user id exists, checked before an interaction is queued
+users_cache = TTLCache("users", ttl=float(os.getenv("CACHE_TTL_USERS", "300")), maxsize=100000)
+
+CACHES = (categories_cache, articles_cache, recommendations_cache, users_cache)
+
+# Recommendation reads are cached once per user and view at this many rows
+# and sliced per request
+RECOMMENDATIONS_READ_LIMIT = int(os.getenv("RECOMMENDATIONS_READ_LIMIT", "100"))
+
+def cache_stats():
+    """
+    Hit/miss counters of every cache, keyed by cache name
+    """
+    return {cache.name: cache.stats() for cache in CACHES}
+
+# Article writes from any module go through db's change listeners
+def _on_article_change(event, article):
+    articles_cache.invalidate()
+    if event != "create":
+        # Recommendation reads embed article rows
+        recommendations_cache.invalidate()
+
+db.subscribe_article_changes(_on_article_change)
+
+# ------------------------
+# USERS
+# ------------------------
+def user_exists(user_id):
+    return users_cache.get_or_load(user_id, lambda: bool(db.get_user(user_id).data))
+
+def create_user(username):
+    result = db.create_user(username)
+    for user in result.data or []:
+        users_cache.invalidate(user["user_id"])
+    return result
+
+def delete_user(user_id):
+    result = db.delete_user(user_id)
+    users_cache.invalidate(user_id)
+    return result
+
+# ------------------------
+# CATEGORIES
+# ------------------------
+def get_all_categories():
+    return categories_cache.get_or_load("all", db.get_all_categories)
+
+def create_category(name):
+    result = db.create_category(name)
+    categories_cache.invalidate()
+    return result
+
+def update_category(category_id, name):
+    result = db.update_category(category_id, name)
+    categories_cache.invalidate()
+    return result
+
+def delete_category(category_id):
+    result = db.delete_category(category_id)
+    categories_cache.invalidate()
+    return result
+
+# ------------------------
+# ARTICLES
+# ------------------------
+def get_all_articles(fields="full"):
+    return articles_cache.get_or_load(("all", fields), lambda: db.get_all_articles(fields))
+
+def get_articles_page(limit, after=None, fields="full"):
+    return articles_cache.get_or_load(
+        ("page", limit, tuple(after) if after else None, fields),
+        lambda: db.get_articles_page(limit, after, fields)
+    )
+
+# ------------------------
+# RECOMMENDATIONS
+# ------------------------
+def get_user_recommended_articles(user_id, fields="full"):
+    return recommendations_cache.get_or_load(
+        (user_id, fields),
+        lambda: db.get_user_recommended_articles(user_id, fields, RECOMMENDATIONS_READ_LIMIT)
+    )
+
+def add_recommendation(user_id, article_id, score):
+    result = db.add_recommendation(user_id, article_id, score)
+    _invalidate_user_recommendations(user_id)
+    return result
+
+def upsert_recommendations(user_id, recommendations):
+    result = db.upsert_recommendations(user_id, recommendations)
+    _invalidate_user_recommendations(user_id)
+    return result
+
+def upsert_recommendations_bulk(recommendations):
+    result = db.upsert_recommendations_bulk(recommendations)
+    for user_id in {row["user_id"] for row in recommendations}:
+        _invalidate_user_recommendations(user_id)
+    return result
+
+def update_recommendation(recommendation_id, score):
+    # The owning user isn't known here, so drop every user's entry
+    result = db.update_recommendation(recommendation_id, score)
+    recommendations_cache.invalidate()
+    return result
+
+def delete_recommendation(recommendation_id):
+    result = db.delete_recommendation(recommendation_id)
+    recommendations_cache.invalidate()
+    return result
+
+def expire_recommendations(before, limit=1000):
+    result = db.expire_recommendations(before, limit)
+    if result.data:
+        # Rows are deleted across many users; a whole generation can expire by age
+        recommendations_cache.invalidate()
+    return result
+
+def _invalidate_user_recommendations(user_id):
+    for fields in db.ARTICLE_VIEWS:
+        recommendations_cache.invalidate((user_id, fields))
@@ -0,0 +1,435 @@
+# src/catalog.py
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+MISSING_TIME = np.iinfo(np.int64).min   # published_at unknown; sorts as oldest
+DETAIL_FIELDS = ("title", "source", "url")
+
+# Sorted indexes stored in a snapshot next to the columns
+_SNAPSHOT_INDEXES = ("id_sorted", "id_rows", "cat_order", "cat_keys", "time_order", "time_keys", "time_ids")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+# ------------------------
+# ARTICLE CATALOG INDEX
+# ------------------------
+class ArticleCatalog:
+    """
+    Columnar in-process index of every article: article_id, category_id and
+    published_at (microseconds since the epoch) live in NumPy arrays, about
+    70 bytes per article with the indexes. Titles, sources and urls are
+    fetched on demand through detail_loader(article_ids) and kept in a
+    bounded LRU.
+
+    Rows written since the last build go to a small delta that is merged at
+    query time; once compact_every of them (or as many dead rows) pile up,
+    the columns are compacted and the sorted indexes rebuilt. watermark is
+    the highest article_id read from storage, so a refresh only has to
+    read newer rows; local writes do not move it. Deletes and updates made
+    by other processes are found by diff()ing against a periodic re-read.
+
+    load_snapshot() maps the columns and indexes from a src.snapshot file
+    instead; they stay shared with other processes until the first
+    compaction copies them.
+    """
+
+    def __init__(self, detail_loader=None, detail_cache_size=10000, compact_every=1024):
+        self.detail_loader = detail_loader
+        self.detail_cache_size = detail_cache_size
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._details = OrderedDict()      # article_id -> (title, source, url)
+        self._reset()
+        self.watermark = None
+        self.loaded = False
+        self._refreshed_at = 0.0
+        self._reconciled_at = 0.0
+
+    def __len__(self):
+        return self._live
+
+    def __contains__(self, article_id):
+        with self._lock:
+            return self._row(article_id) is not None
+
+    # ----- loading -----
+    def ensure_loaded(self, loader):
+        """
+        Load the catalog once from loader() (an iterable of article rows)
+        """
+        if self.loaded:
+            return self
+        with self._lock:
+            if not self.loaded:
+                self.load(loader())
+        return self
+
+    def load(self, articles):
+        ids, categories, published = [], [], []
+        for article in articles:
+            ids.append(article["article_id"])
+            categories.append(_category(article.get("category_id")))
+            published.append(to_micros(article.get("published_at")))
+        with self._lock:
+            self._reset()
+            self._details.clear()
+            n = len(ids)
+            self._grow(n)
+            self._ids[:n] = ids
+            self._categories[:n] = categories
+            self._published[:n] = published
+            self._alive[:n] = True
+            self._size = n
+            self._build()
+            self.watermark = max(ids) if ids else None
+            self._refreshed_at = self._reconciled_at = time.monotonic()
+            self.loaded = True
+
+    def load_snapshot(self, snapshot):
+        with self._lock:
+            self._reset()
+            self._details.clear()
+            n = len(snapshot)
+            self._ids = snapshot["article_ids"]
+            self._categories = snapshot["category_ids"]
+            self._published = snapshot["published"]
+            # The only column written in place, so it is the only private one
+            self._alive = np.ones(n, bool)
+            self._size = self._live = self._built = n
+            for name in _SNAPSHOT_INDEXES:
+                setattr(self, f"_{name}", snapshot[name])
+            self.watermark = snapshot.meta["watermark"]
+            self._refreshed_at = time.monotonic()
+            # The snapshot may predate deletes, so reconcile at the first chance
+            self._reconciled_at = 0.0
+            self.loaded = True
+
+    def snapshot_arrays(self):
+        """
+        {name: array} of the columns and indexes load_snapshot() reads, compacted first
+        """
+        with self._lock:
+            if self._recent or self._dead:
+                self._build()
+            return {
+                "article_ids": self._ids[:self._size],
+                "category_ids": self._categories[:self._size],
+                "published": self._published[:self._size],
+                **{name: getattr(self, f"_{name}") for name in _SNAPSHOT_INDEXES},
+            }
+
+    def advance_watermark(self, article_id):
+        """
+        Record that every article up to article_id has been read from storage.
+        Only reads advance it: a local insert may have a higher id than rows
+        another process wrote but this one has not read yet
+        """
+        with self._lock:
+            if self.watermark is None or article_id > self.watermark:
+                self.watermark = article_id
+
+    def claim_refresh(self, interval):
+        """
+        True for the one caller that should refresh now, at most once per interval seconds
+        """
+        return self._claim("_refreshed_at", interval)
+
+    def claim_reconcile(self, interval):
+        """
+        True for the one caller that should reconcile with storage now, at
+        most once per interval seconds
+        """
+        return self._claim("_reconciled_at", interval)
+
+    def diff(self, stored, up_to):
+        """
+        Compare with stored, {article_id: (category_id, published_at)} of
+        every article up to article_id up_to as read back from storage.
+        Returns (ids held here that storage no longer has, ids whose
+        category or publish time differ)
+        """
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self._size])
+            held = zip(self._ids[rows].tolist(), self._categories[rows].tolist(), self._published[rows].tolist())
+            missing, changed = [], []
+            for article_id, category, published in held:
+                if article_id > up_to:
+                    continue
+                row = stored.get(article_id)
+                if row is None:
+                    missing.append(article_id)
+                elif (_category(row[0]), to_micros(row[1])) != (category, published):
+                    changed.append(article_id)
+            return missing, changed
+
+    # ----- writes -----
+    def upsert(self, article):
+        """
+        Insert or update an article; fields missing from a partial row keep their values
+        """
+        article_id = article["article_id"]
+        with self._lock:
+            row = self._row(article_id)
+            if row is not None:
+                category = self._categories[row] if "category_id" not in article else _category(article["category_id"])
+                published = self._published[row] if "published_at" not in article else to_micros(article["published_at"])
+                self._kill(row)
+            else:
+                category = _category(article.get("category_id"))
+                published = to_micros(article.get("published_at"))
+            self._append(article_id, category, published)
+            self._details.pop(article_id, None)
+            if all(field in article for field in DETAIL_FIELDS):
+                self._remember(article_id, tuple(article[field] for field in DETAIL_FIELDS))
+            self._maybe_compact()
+
+    def remove(self, article_id):
+        with self._lock:
+            row = self._row(article_id)
+            if row is not None:
+                self._kill(row)
+                self._details.pop(article_id, None)
+                self._maybe_compact()
+
+    # ----- reads -----
+    def category_of(self, article_id):
+        with self._lock:
+            row = self._row(article_id)
+            return None if row is None else _category_value(self._categories[row])
+
+    def get(self, article_id):
+        return self.rows([article_id])[0]
+
+    def rows(self, article_ids, details=True):
+        """
+        Article dicts for article_ids in the same order, None for unknown ids.
+        With details, title/source/url are filled in, loading the uncached
+        ones in one detail_loader call
+        """
+        with self._lock:
+            metas = []
+            for article_id in article_ids:
+                row = self._row(article_id)
+                metas.append(None if row is None else (self._categories[row], self._published[row]))
+            missing = [a for a, meta in zip(article_ids, metas) if meta is not None and a not in self._details]
+
+        if details and missing and self.detail_loader is not None:
+            fetched = {row["article_id"]: row for row in self.detail_loader(missing)}
+            with self._lock:
+                for article_id, row in fetched.items():
+                    self._remember(article_id, tuple(row.get(field) for field in DETAIL_FIELDS))
+
+        result = []
+        with self._lock:
+            for article_id, meta in zip(article_ids, metas):
+                if meta is None:
+                    result.append(None)
+                    continue
+                article = {"article_id": article_id}
+                if details:
+                    detail = self._details.get(article_id)
+                    if detail is not None:
+                        self._details.move_to_end(article_id)
+                    article.update(zip(DETAIL_FIELDS, detail or (None,) * len(DETAIL_FIELDS)))
+                article["category_id"] = _category_value(meta[0])
+                article["published_at"] = from_micros(meta[1])
+                result.append(article)
+        return result
+
+    def newest(self, category_id, exclude=(), limit=None):
+        """
+        [(article_id, published_at as epoch seconds)] of a category, newest first,
+        skipping ids in exclude
+        """
+        category = _category(category_id)
+        with self._lock:
+            lo, hi = np.searchsorted(self._cat_keys, [category, category + 1])
+            picked = self._walk(self._cat_order[lo:hi], exclude, limit)
+            picked += [r for r in self._recent if self._categories[r] == category and self._alive[r]
+                       and int(self._ids[r]) not in exclude]
+            rows = self._newest_first(picked)[:limit]
+            return [(int(self._ids[r]), _seconds(self._published[r])) for r in rows]
+
+    def page(self, limit, after=None):
+        """
+        Ids of up to limit articles newest first (by published_at, then
+        article_id), strictly after the (published_at, article_id) key
+        """
+        with self._lock:
+            if after is None:
+                key = None
+                stop = len(self._time_order)
+            else:
+                key = (to_micros(after[0]), int(after[1]))
+                stop = self._time_position(*key)
+            picked = self._walk(self._time_order[:stop], (), limit)
+            picked += [r for r in self._recent if self._alive[r]
+                       and (key is None or (self._published[r], self._ids[r]) < key)]
+            return [int(self._ids[r]) for r in self._newest_first(picked)[:limit]]
+
+    # ----- internal -----
+    def _reset(self):
+        self._ids = np.empty(0, np.int64)
+        self._categories = np.empty(0, np.int64)
+        self._published = np.empty(0, np.int64)
+        self._alive = np.empty(0, bool)
+        self._size = 0
+        self._live = 0
+        self._dead = 0
+        self._built = 0               # rows [0, _built) are covered by the sorted indexes
+        self._recent = []             # rows appended since the last build
+        self._recent_rows = {}        # article_id -> row for those rows
+        self._id_sorted = np.empty(0, np.int64)
+        self._id_rows = np.empty(0, np.int64)
+        self._cat_order = np.empty(0, np.int64)
+        self._cat_keys = np.empty(0, np.int64)
+        self._time_order = np.empty(0, np.int64)
+        self._time_keys = np.empty(0, np.int64)
+        self._time_ids = np.empty(0, np.int64)
+
+    def _grow(self, needed):
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 1024)
+        for name in ("_ids", "_categories", "_published", "_alive"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _append(self, article_id, category, published):
+        self._grow(self._size + 1)
+        row = self._size
+        self._ids[row] = article_id
+        self._categories[row] = category
+        self._published[row] = published
+        self._alive[row] = True
+        self._size += 1
+        self._live += 1
+        self._recent.append(row)
+        self._recent_rows[article_id] = row
+
+    def _kill(self, row):
+        self._alive[row] = False
+        self._live -= 1
+        self._dead += 1
+        if self._recent_rows.get(int(self._ids[row])) == row:
+            del self._recent_rows[int(self._ids[row])]
+
+    def _row(self, article_id):
+        row = self._recent_rows.get(article_id)
+        if row is not None:
+            return row
+        i = np.searchsorted(self._id_sorted, article_id)
+        if i < len(self._id_sorted) and self._id_sorted[i] == article_id:
+            row = int(self._id_rows[i])
+            if self._alive[row]:
+                return row
+        return None
+
+    def _claim(self, attr, interval):
+        with self._lock:
+            now = time.monotonic()
+            if not self.loaded or now - getattr(self, attr) < interval:
+                return False
+            setattr(self, attr, now)
+            return True
+
+    def _maybe_compact(self):
+        if len(self._recent) >= self.compact_every or self._dead >= max(self.compact_every, self._live // 4):
+            self._build()
+
+    def _build(self):
+        # Compact the columns down to live rows, then sort the indexes
+        keep = np.flatnonzero(self._alive[:self._size])
+        n = len(keep)
+        self._ids = self._ids[keep]
+        self._categories = self._categories[keep]
+        self._published = self._published[keep]
+        self._alive = np.ones(n, bool)
+        self._size = self._live = self._built = n
+        self._dead = 0
+        self._recent, self._recent_rows = [], {}
+
+        self._id_rows = np.argsort(self._ids, kind="stable")
+        self._id_sorted = self._ids[self._id_rows]
+        # Ascending by (category, published_at, article_id); read backwards for newest first
+        self._cat_order = np.lexsort((self._ids, self._published, self._categories))
+        self._cat_keys = self._categories[self._cat_order]
+        self._time_order = np.lexsort((self._ids, self._published))
+        self._time_keys = self._published[self._time_order]
+        self._time_ids = self._ids[self._time_order]
+
+    def _walk(self, order, exclude, limit):
+        # Live, non-excluded rows from the end of an ascending index, read
+        # in growing blocks so a small limit only touches a few rows
+        picked = []
+        end, step = len(order), max(2 * (limit or 0), 64)
+        while end > 0:
+            start = max(0, end - step)
+            for row in order[start:end][::-1].tolist():
+                if not self._alive[row] or (exclude and int(self._ids[row]) in exclude):
+                    continue
+                picked.append(row)
+                if limit is not None and len(picked) >= limit:
+                    return picked
+            end, step = start, step * 2
+        return picked
+
+    def _time_position(self, published, article_id):
+        # Number of indexed rows that sort before (published, article_id)
+        lo = int(np.searchsorted(self._time_keys, published, side="left"))
+        hi = int(np.searchsorted(self._time_keys, published, side="right"))
+        return lo + int(np.searchsorted(self._time_ids[lo:hi], article_id))
+
+    def _newest_first(self, rows):
+        return sorted(rows, key=lambda r: (self._published[r], self._ids[r]), reverse=True)
+
+    def _remember(self, article_id, detail):
+        self._details[article_id] = detail
+        self._details.move_to_end(article_id)
+        while len(self._details) > self.detail_cache_size:
+            self._details.popitem(last=False)
+
+
+# ------------------------
+# HELPERS
+# ------------------------
+def to_micros(value):
+    """
+    Microseconds since the epoch of a timestamp string or datetime, MISSING_TIME if unknown
+    """
+    if not value:
+        return MISSING_TIME
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return MISSING_TIME
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // _MICROSECOND
+
+def from_micros(value):
+    """
+    Fixed-width UTC ISO string of microseconds since the epoch, None if unknown
+    """
+    if value == MISSING_TIME:
+        return None
+    return (_EPOCH + int(value) * _MICROSECOND).isoformat(timespec="microseconds")
+
+def _seconds(value):
+    return float("nan") if value == MISSING_TIME else value / 1e6
+
+def _category(category_id):
+    return -1 if category_id is None else int(category_id)
+
+def _category_value(value):
+    return None if value == -1 else int(value)
@@ -0,0 +1,152 @@
+# src/collaborative.py
+import math
+import threading
+from collections import OrderedDict, deque
+
+from src.scoring import interaction_weight, top_n
+
+
+# ------------------------
+# ITEM-ITEM CO-OCCURRENCE
+# ------------------------
+class ItemSimilarity:
+    """
+    Item-to-item collaborative filtering from interaction co-occurrence.
+    Two articles co-occur when a user interacted positively with both
+    within window interactions of each other. Each article keeps only its
+    max_neighbors strongest co-occurring articles, replacing the weakest
+    Space-Saving style when a new one arrives, so a lookup reads at most
+    max_neighbors entries. Similarity is the co-occurrence count over
+    sqrt(count_a * count_b) + shrink, where counts are users per article;
+    shrink keeps pairs seen by one or two users from scoring like
+    established ones.
+
+    New interactions are paired with the recent articles of their user;
+    those are kept for up to max_users users, and history_loader(user_ids)
+    supplies interaction rows for the others.
+    """
+
+    def __init__(self, history_loader=None, max_neighbors=50, window=20, max_users=100000, shrink=5.0):
+        self.history_loader = history_loader
+        self.max_neighbors = max_neighbors
+        self.window = window
+        self.max_users = max_users
+        self.shrink = shrink
+        self._lock = threading.Lock()
+        self._reset()
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._counts)
+
+    # ----- loading -----
+    def ensure_loaded(self, loader):
+        """
+        Build the index once from loader(), an iterable of interaction rows
+        """
+        if self.loaded:
+            return self
+        with self._lock:
+            if not self.loaded:
+                self._reset()
+                for row in loader():
+                    self._add(row)
+                self.loaded = True
+        return self
+
+    # ----- writes -----
+    def add_interactions(self, rows):
+        """
+        Fold new interaction rows in, reading the history of users whose
+        recent articles are not in memory first
+        """
+        with self._lock:
+            missing = {row["user_id"] for row in rows} - self._recent.keys()
+        history = self.history_loader(list(missing)) if missing and self.history_loader else []
+
+        with self._lock:
+            # The new rows may already be in the table; only older ones seed the history
+            new = {(row["user_id"], row["article_id"]) for row in rows}
+            for row in history:
+                if row["user_id"] in missing and (row["user_id"], row["article_id"]) not in new:
+                    if interaction_weight(row.get("interaction_type")) > 0:
+                        recent = self._recent_of(row["user_id"])
+                        if row["article_id"] not in recent:
+                            recent.append(row["article_id"])
+            for row in rows:
+                self._add(row)
+
+    # ----- reads -----
+    def similar(self, article_id, k=10):
+        """
+        [(article_id, similarity)] of up to k articles most often read with article_id, best first
+        """
+        with self._lock:
+            return top_n(self._similarities(article_id), k)
+
+    def recommend(self, seeds, k, exclude=()):
+        """
+        {article_id: score} of up to k articles most similar to the seed
+        articles on average, skipping ids in exclude; scores are in [0, 1]
+        """
+        totals = {}
+        with self._lock:
+            for seed in seeds:
+                for article_id, similarity in self._similarities(seed):
+                    if article_id not in exclude:
+                        totals[article_id] = totals.get(article_id, 0.0) + similarity
+        if not totals:
+            return {}
+        n = len(seeds)
+        return {article_id: total / n for article_id, total in top_n(totals.items(), k)}
+
+    # ----- internal -----
+    def _reset(self):
+        self._counts = {}             # article_id -> users who interacted positively
+        self._neighbors = {}          # article_id -> {article_id: co-occurrence count}
+        self._recent = OrderedDict()  # user_id -> deque of recent article ids, least recent user first
+
+    def _recent_of(self, user_id):
+        recent = self._recent.get(user_id)
+        if recent is None:
+            recent = self._recent[user_id] = deque(maxlen=self.window)
+            if len(self._recent) > self.max_users:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(user_id)
+        return recent
+
+    def _add(self, row):
+        if interaction_weight(row.get("interaction_type")) <= 0:
+            return
+        article_id = row["article_id"]
+        recent = self._recent_of(row["user_id"])
+        if article_id in recent:
+            return
+        self._counts[article_id] = self._counts.get(article_id, 0) + 1
+        for other in recent:
+            self._bump(article_id, other)
+            self._bump(other, article_id)
+        recent.append(article_id)
+
+    def _bump(self, article_id, other):
+        neighbors = self._neighbors.setdefault(article_id, {})
+        if other in neighbors:
+            neighbors[other] += 1
+        elif len(neighbors) < self.max_neighbors:
+            neighbors[other] = 1
+        else:
+            # Space-Saving: the newcomer inherits the weakest count, so a
+            # pair that keeps co-occurring climbs back in
+            weakest = min(neighbors, key=neighbors.get)
+            neighbors[other] = neighbors.pop(weakest) + 1
+
+    def _similarities(self, article_id):
+        neighbors = self._neighbors.get(article_id)
+        if not neighbors:
+            return []
+        count = self._counts.get(article_id, 1)
+        return [
+            (other, min(1.0, n / (math.sqrt(count * self._counts.get(other, 1)) + self.shrink)))
+            for other, n in neighbors.items()
+        ]
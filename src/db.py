@@ -1,144 +1,340 @@
 # db.py
 import os
-from supabase import create_client
+import sys
+import threading
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.storage import create_backend
+from src.metrics import instrument_module
+
 # Load environment variables
 load_dotenv()
-url = os.getenv("SUPABASE_URL")
-key = os.getenv("SUPABASE_KEY")
 
-supabase = create_client(url, key)
+# ------------------------
+# STORAGE BACKEND
+# ------------------------
+# Supabase by default; STORAGE_BACKEND=sqlite keeps everything in SQLITE_PATH.
+# Created on first use so importing this module never connects anywhere
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+def close_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.close()
+            _backend = None
+
+def _forget_backend():
+    # A forked child must not share the parent's sockets; it connects on first use
+    global _backend, _backend_lock
+    _backend, _backend_lock = None, threading.Lock()
+
+os.register_at_fork(after_in_child=_forget_backend)
+
+# ------------------------
+# COLUMN PROJECTIONS
+# ------------------------
+# Named article views so call sites only fetch the columns they use
+ARTICLE_VIEWS = {
+    "full": "*",
+    "summary": "article_id, title, source, url, category_id, published_at",
+    "id_category": "article_id, category_id",
+    "meta": "article_id, category_id, published_at",
+    "text": "article_id, category_id, published_at, title, content",
+}
+
+def article_columns(fields="full"):
+    """
+    Return the select list for a named article view
+    """
+    if fields not in ARTICLE_VIEWS:
+        raise ValueError(f"Unknown article view: {fields}")
+    return ARTICLE_VIEWS[fields]
+
+# ------------------------
+# CHANGE LISTENERS
+# ------------------------
+_article_listeners = []
+
+def subscribe_article_changes(callback):
+    """
+    Register callback(event, article) to run after an article is written.
+    event is one of "create", "update" or "delete".
+    """
+    _article_listeners.append(callback)
+
+def _notify_article_change(event, articles):
+    for article in articles:
+        for callback in _article_listeners:
+            callback(event, article)
 
 # ------------------------
 # USERS
 # ------------------------
 def create_user(username):
-    return supabase.table("Users").insert({
-        "username": username
-    }).execute()
+    return get_backend().create_user(username)
 
 def get_user(user_id):
-    return supabase.table("Users").select("*").eq("user_id", user_id).execute()
+    return get_backend().get_user(user_id)
 
 def update_user(user_id, username):
-    return supabase.table("Users").update({
-        "username": username
-    }).eq("user_id", user_id).execute()
+    return get_backend().update_user(user_id, username)
 
 def delete_user(user_id):
-    return supabase.table("Users").delete().eq("user_id", user_id).execute()
+    return get_backend().delete_user(user_id)
+
+def iter_user_ids(start_id=None, end_id=None, chunk_size=1000):
+    """
+    Yield user ids in [start_id, end_id) as lists of at most chunk_size ids
+    """
+    after = start_id - 1 if start_id is not None else None
+    while True:
+        ids = [row["user_id"] for row in get_backend().get_user_ids_page(chunk_size, after, end_id).data or []]
+        if ids:
+            yield ids
+        if len(ids) < chunk_size:
+            return
+        after = ids[-1]
 
 
 # ------------------------
 # CATEGORIES
 # ------------------------
 def create_category(name):
-    return supabase.table("Categories").insert({
-        "name": name
-    }).execute()
+    return get_backend().create_category(name)
 
 def get_all_categories():
-    return supabase.table("Categories").select("*").execute()
+    return get_backend().get_all_categories()
 
 def update_category(category_id, name):
-    return supabase.table("Categories").update({
-        "name": name
-    }).eq("category_id", category_id).execute()
+    return get_backend().update_category(category_id, name)
 
 def delete_category(category_id):
-    return supabase.table("Categories").delete().eq("category_id", category_id).execute()
+    return get_backend().delete_category(category_id)
 
 
 # ------------------------
 # ARTICLES
 # ------------------------
 def create_article(title, content, source, url, category_id, published_at):
-    return supabase.table("Articles").insert({
+    result = get_backend().create_articles([{
         "title": title,
         "content": content,
         "source": source,
         "url": url,
         "category_id": category_id,
         "published_at": published_at
-    }).execute()
+    }])
+    _notify_article_change("create", result.data or [])
+    return result
+
+def create_articles(articles):
+    """
+    Insert many articles in one request.
+    articles is a list of {title, content, source, url, category_id, published_at} dicts
+    """
+    result = get_backend().create_articles(articles)
+    _notify_article_change("create", result.data or [])
+    return result
+
+def get_all_articles(fields="full"):
+    return get_backend().get_all_articles(article_columns(fields))
+
+def get_articles_page(limit, after=None, fields="full"):
+    """
+    Fetch one page of articles ordered newest first (keyset pagination).
+    after is the (published_at, article_id) of the last row of the previous page
+    """
+    columns = article_columns(fields)
+    if columns != "*" and "published_at" not in columns:
+        columns += ", published_at"
+    return get_backend().get_articles_page(limit, after, columns)
+
+def iter_articles(chunk_size=500, fields="full"):
+    """
+    Yield every article in lists of at most chunk_size rows, newest first
+    """
+    after = None
+    while True:
+        rows = get_articles_page(chunk_size, after, fields).data or []
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        after = (rows[-1]["published_at"], rows[-1]["article_id"])
+
+def get_articles_by_ids(article_ids, fields="full"):
+    return get_backend().get_articles_by_ids(article_ids, article_columns(fields))
 
-def get_all_articles():
-    return supabase.table("Articles").select("*").execute()
+def iter_articles_after(after_id=None, chunk_size=500, fields="full"):
+    """
+    Yield articles with article_id > after_id in id order, in lists of at
+    most chunk_size rows; ids only grow, so this reads just the new rows
+    """
+    while True:
+        rows = get_backend().get_articles_after(after_id, chunk_size, article_columns(fields)).data or []
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        after_id = rows[-1]["article_id"]
 
 def update_article(article_id, **kwargs):
     # kwargs = {title, content, source, url, category_id, published_at}
-    return supabase.table("Articles").update(kwargs).eq("article_id", article_id).execute()
+    result = get_backend().update_article(article_id, kwargs)
+    _notify_article_change("update", result.data or [])
+    return result
 
 def delete_article(article_id):
-    return supabase.table("Articles").delete().eq("article_id", article_id).execute()
+    result = get_backend().delete_article(article_id)
+    _notify_article_change("delete", [{"article_id": article_id}])
+    return result
 
 
 # ------------------------
 # USER INTERACTIONS
 # ------------------------
 def add_interaction(user_id, article_id, interaction_type):
-    return supabase.table("User_Interactions").insert({
+    return get_backend().add_interactions([{
         "user_id": user_id,
         "article_id": article_id,
         "interaction_type": interaction_type
-    }).execute()
+    }])
+
+def add_interactions(interactions):
+    """
+    Insert many interactions in one request.
+    interactions is a list of {user_id, article_id, interaction_type, interaction_time} dicts
+    """
+    return get_backend().add_interactions(interactions)
 
 def get_user_interactions(user_id):
-    return supabase.table("User_Interactions").select("*").eq("user_id", user_id).execute()
+    return get_backend().get_user_interactions(user_id)
+
+def get_user_interacted_article_ids(user_id):
+    return get_backend().get_user_interacted_article_ids(user_id)
+
+def get_interactions_for_users(user_ids, page_size=1000):
+    """
+    Fetch the interactions of many users in one keyset-paginated pass
+    """
+    rows, after = [], None
+    while True:
+        page = get_backend().get_interactions_page(user_ids, page_size, after).data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        after = page[-1]["interaction_id"]
+
+def iter_interactions_since(since, chunk_size=1000):
+    """
+    Yield interactions at or after the since datetime in id order, in
+    lists of at most chunk_size rows
+    """
+    after = None
+    while True:
+        rows = get_backend().get_interactions_since(since, chunk_size, after).data or []
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        after = rows[-1]["interaction_id"]
 
 def update_interaction(interaction_id, interaction_type):
-    return supabase.table("User_Interactions").update({
-        "interaction_type": interaction_type
-    }).eq("interaction_id", interaction_id).execute()
+    return get_backend().update_interaction(interaction_id, interaction_type)
 
 def delete_interaction(interaction_id):
-    return supabase.table("User_Interactions").delete().eq("interaction_id", interaction_id).execute()
+    return get_backend().delete_interaction(interaction_id)
+
+
+# ------------------------
+# USER PROFILES
+# ------------------------
+def get_user_profile(user_id):
+    return get_backend().get_user_profiles([user_id])
+
+def get_user_profiles(user_ids):
+    return get_backend().get_user_profiles(user_ids)
+
+def insert_user_profiles(profiles):
+    # profiles = [{user_id, category_weights, term_weights, updated_at}]
+    return get_backend().insert_user_profiles(profiles)
+
+def update_user_profile(profile, version):
+    """
+    Compare-and-set write of one profile read at version
+    """
+    return get_backend().update_user_profile(profile, version)
 
 
 # ------------------------
 # RECOMMENDATIONS
 # ------------------------
 def add_recommendation(user_id, article_id, score):
-    return supabase.table("Recommendations").insert({
-        "user_id": user_id,
-        "article_id": article_id,
-        "score": score
-    }).execute()
+    return get_backend().add_recommendation(user_id, article_id, score)
+
+def upsert_recommendations(user_id, recommendations):
+    """
+    Replace a user's recommendations in one round trip.
+    recommendations is a list of {"article_id": ..., "score": ...} dicts; rows are
+    upserted on (user_id, article_id) and the user's other rows are deleted.
+    On Supabase this is replace_recommendations() in sql/recommendations.sql
+    """
+    return get_backend().upsert_recommendations(user_id, recommendations)
+
+def upsert_recommendations_bulk(recommendations):
+    """
+    Replace the recommendations of many users in one round trip.
+    recommendations is a list of {"user_id", "article_id", "score"} dicts; every
+    user_id present loses its rows that are not in the list.
+    On Supabase this is replace_recommendations_bulk() in sql/recommendations.sql
+    """
+    return get_backend().upsert_recommendations_bulk(recommendations)
 
 def get_recommendations(user_id):
-    return supabase.table("Recommendations").select("*").eq("user_id", user_id).execute()
+    return get_backend().get_recommendations(user_id)
 
 def update_recommendation(recommendation_id, score):
-    return supabase.table("Recommendations").update({
-        "score": score
-    }).eq("recommendation_id", recommendation_id).execute()
+    return get_backend().update_recommendation(recommendation_id, score)
 
 def delete_recommendation(recommendation_id):
-    return supabase.table("Recommendations").delete().eq("recommendation_id", recommendation_id).execute()
+    return get_backend().delete_recommendation(recommendation_id)
+
+def expire_recommendations(before, limit=1000):
+    """
+    Delete up to limit superseded recommendations or ones made before the
+    before datetime; .data is the number deleted
+    """
+    return get_backend().expire_recommendations(before, limit)
 
 
 # ------------------------
 # HELPER FUNCTIONS
 # ------------------------
-def get_user_recommended_articles(user_id):
+def get_user_recommended_articles(user_id, fields="full", limit=None):
     """
-    Fetch recommended articles for a user with full article details
+    Fetch the user's newest recommendations, best first, with article details in the given view
     """
-    return (
-        supabase.table("Recommendations")
-        .select("score, recommended_at, Articles(*)")
-        .eq("user_id", user_id)
-        .execute()
-    )
+    return get_backend().get_user_recommended_articles(user_id, article_columns(fields), limit)
 
-def get_user_interactions_with_articles(user_id):
+def get_user_interactions_with_articles(user_id, fields="full"):
     """
-    Fetch user interactions along with full article details
+    Fetch user interactions along with article details in the given view
     """
-    return (
-        supabase.table("User_Interactions")
-        .select("interaction_type, interaction_time, Articles(*)")
-        .eq("user_id", user_id)
-        .execute()
-    )
+    return get_backend().get_user_interactions_with_articles(user_id, article_columns(fields))
+
+
+# Time and count every query function (see src/metrics.py); src.logic and
+# src.cached_db import these names after this runs, so they get the wrappers
+instrument_module(globals(), "db", exclude=("article_columns", "subscribe_article_changes", "get_backend", "close_backend"))
@@ -0,0 +1,235 @@
+# src/dedupe.py
+import logging
+import os
+import re
+import tempfile
+import threading
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ------------------------
+# MINHASH SIGNATURES
+# ------------------------
+NUM_PERM = 128           # hash functions per signature
+BANDS = 16               # LSH bands; NUM_PERM / BANDS rows each
+SHINGLE_SIZE = 4         # words per shingle
+THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", "0.8"))   # estimated Jaccard for a duplicate
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(1375)   # fixed seed: persisted signatures must stay comparable
+_A = _rng.randint(1, _PRIME, NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, NUM_PERM).astype(np.uint64)
+_WORD_RE = re.compile(r"\w+")
+
+def minhash(text):
+    """
+    MinHash signature (NUM_PERM uint32 values) of the word shingles of text
+    """
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) <= SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    x = np.fromiter((zlib.crc32(s.encode()) % _PRIME for s in shingles), np.uint64, len(shingles))
+    # a * x + b stays below 2**63 because a, b < 2**31 and x < 2**31
+    return ((_A[:, None] * x[None, :] + _B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+def similarity(sig_a, sig_b):
+    """
+    Estimated Jaccard similarity of two signatures
+    """
+    return float(np.mean(sig_a == sig_b))
+
+
+# ------------------------
+# LSH DUPLICATE INDEX
+# ------------------------
+class DuplicateIndex:
+    """
+    Locality-sensitive hashing index over MinHash signatures.
+    Articles whose signatures collide in any band are compared directly, so a
+    lookup only touches likely duplicates. Each article belongs to a cluster
+    named after the first article of its group. The index is saved to path
+    so a restarted worker does not rehash the catalog: once after it is
+    built, then from a background thread at most every save_interval
+    seconds while it has unsaved changes, so ingest never waits on a save.
+    watermark is the highest article_id read from storage and is saved
+    with it; as in ArticleCatalog, local writes do not move it.
+    """
+
+    def __init__(self, path=None, save_interval=30.0):
+        self.path = path
+        self.save_interval = save_interval
+        self._save_timer = None
+        self._lock = threading.RLock()
+        self._signatures = {}                     # article_id -> signature
+        self._clusters = {}                       # article_id -> cluster id
+        self._bands = [{} for _ in range(BANDS)]  # band bytes -> set of article ids
+        self._dirty = 0
+        self.watermark = None
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def ensure_loaded(self, loader, newer_loader=None):
+        """
+        Load the saved index, or build it from loader() (article rows) and
+        save it. A saved index is caught up with newer_loader(after_id),
+        the rows with article_id above its saved watermark
+        """
+        if self.loaded:
+            return self
+        with self._lock:
+            if not self.loaded:
+                if self.path and os.path.exists(self.path):
+                    self.load(self.path)
+                    if newer_loader is not None:
+                        for article in newer_loader(self.watermark):
+                            self.upsert(article)
+                            self.advance_watermark(article["article_id"])
+                else:
+                    for article in loader():
+                        self.upsert(article)
+                        self.advance_watermark(article["article_id"])
+                    self.save()
+                self.loaded = True
+        return self
+
+    def find_duplicate(self, signature, exclude=None):
+        """
+        Return (article_id, similarity) of the closest indexed near-duplicate, or None
+        """
+        with self._lock:
+            candidates = set()
+            for band, key in zip(self._bands, _band_keys(signature)):
+                candidates |= band.get(key, set())
+            candidates.discard(exclude)
+            best = None
+            for article_id in candidates:
+                score = similarity(signature, self._signatures[article_id])
+                if score >= THRESHOLD and (best is None or score > best[1]):
+                    best = (article_id, score)
+            return best
+
+    def upsert(self, article, signature=None):
+        """
+        Index an article row, hashing its content unless signature is given;
+        rows without content keep their current signature
+        """
+        if not article.get("content"):
+            return
+        if signature is None:
+            signature = minhash(article["content"])
+        with self._lock:
+            article_id = article["article_id"]
+            self._remove(article_id)
+            match = self.find_duplicate(signature, exclude=article_id)
+            self._add(article_id, signature, self._clusters[match[0]] if match else article_id)
+            self._changed()
+
+    def remove(self, article_id):
+        with self._lock:
+            self._remove(article_id)
+            self._changed()
+
+    def advance_watermark(self, article_id):
+        """
+        Record that every article up to article_id has been read from storage
+        """
+        with self._lock:
+            if self.watermark is None or article_id > self.watermark:
+                self.watermark = article_id
+
+    def cluster_of(self, article_id):
+        return self._clusters.get(article_id, article_id)
+
+    def save(self, path=None):
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            ids = np.array(list(self._signatures), np.int64)
+            signatures = np.array([self._signatures[i] for i in ids.tolist()], np.uint32).reshape(-1, NUM_PERM)
+            clusters = np.array([self._clusters[i] for i in ids.tolist()], np.int64)
+            watermark = np.array(-1 if self.watermark is None else self.watermark, np.int64)
+            self._dirty = 0
+        # Write then rename so readers never see a half-written file; the
+        # temporary name is unique so concurrent savers don't collide
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, ids=ids, signatures=signatures, clusters=clusters, watermark=watermark)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def flush(self):
+        """
+        Save now if there are unsaved changes, instead of waiting for the background save
+        """
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            dirty = self._dirty
+        if dirty:
+            self.save()
+
+    def load(self, path):
+        data = np.load(path)
+        with self._lock:
+            self._signatures, self._clusters = {}, {}
+            self._bands = [{} for _ in range(BANDS)]
+            for article_id, signature, cluster in zip(data["ids"].tolist(), data["signatures"], data["clusters"].tolist()):
+                self._add(article_id, signature, cluster)
+            if "watermark" in data.files:
+                watermark = int(data["watermark"])
+                self.watermark = watermark if watermark >= 0 else None
+            else:
+                # Saved before the watermark was; its ids are the best guess
+                self.watermark = max(self._signatures, default=None)
+
+    # ----- internal -----
+    def _add(self, article_id, signature, cluster):
+        self._signatures[article_id] = signature
+        self._clusters[article_id] = cluster
+        for band, key in zip(self._bands, _band_keys(signature)):
+            band.setdefault(key, set()).add(article_id)
+
+    def _remove(self, article_id):
+        signature = self._signatures.pop(article_id, None)
+        if signature is None:
+            return
+        self._clusters.pop(article_id, None)
+        for band, key in zip(self._bands, _band_keys(signature)):
+            members = band.get(key)
+            if members:
+                members.discard(article_id)
+                if not members:
+                    del band[key]
+
+    def _changed(self):
+        self._dirty += 1
+        if self.loaded and self.path and self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_interval, self._save_in_background)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save_in_background(self):
+        # Cleared first so changes made while saving schedule the next save
+        with self._lock:
+            self._save_timer = None
+        try:
+            self.save()
+        except Exception:
+            logger.exception("duplicate index: background save to %s failed", self.path)
+
+
+def _band_keys(signature):
+    rows = NUM_PERM // BANDS
+    return [signature[i * rows:(i + 1) * rows].tobytes() for i in range(BANDS)]
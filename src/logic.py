@@ -4,18 +4,284 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.db import (
-    create_user, get_user, update_user, delete_user,
+    get_user, update_user, iter_user_ids,
+    create_article, create_articles, iter_articles, iter_articles_after, get_articles_by_ids,
+    update_article, delete_article,
+    add_interaction, add_interactions, get_user_interactions, get_user_interactions_with_articles,
+    get_user_interacted_article_ids, get_interactions_for_users, iter_interactions_since,
+    get_user_profile, get_user_profiles, insert_user_profiles, update_user_profile,
+    subscribe_article_changes
+)
+# Hot reads go through the read-through cache, which also invalidates on writes
+from src.cached_db import (
+    create_user, delete_user, user_exists,
     create_category, get_all_categories, update_category, delete_category,
-    create_article, get_all_articles, update_article, delete_article,
-    add_interaction, get_user_interactions_with_articles,
-    add_recommendation, get_user_recommended_articles
+    get_all_articles, get_articles_page,
+    add_recommendation, upsert_recommendations, upsert_recommendations_bulk,
+    get_user_recommended_articles, expire_recommendations
+)
+from src.catalog import ArticleCatalog, MISSING_TIME, from_micros, to_micros
+from src.snapshot import open_if_changed
+from src.ranking import RankingEngine
+from src.profiles import UserProfile, parse_time
+from src.scoring import interaction_weight, freshness, to_epoch, top_n as select_top, ARTICLE_HALF_LIFE_DAYS
+from src.dedupe import DuplicateIndex, minhash
+from src.collaborative import ItemSimilarity
+from src.trending import Trending
+from src.write_behind import WriteBehindBuffer
+from src.retention import RetentionSweeper
+from src.metrics import instrument, instrumented
+from datetime import datetime, timezone
+import base64
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# ------------------------
+# ARTICLE CATALOG
+# ------------------------
+# Only ids, categories and publish times are held for every article; titles,
+# sources and urls are read on demand into a bounded cache
+article_catalog = ArticleCatalog(
+    detail_loader=lambda article_ids: get_articles_by_ids(article_ids, fields="summary").data or [],
+    detail_cache_size=int(os.getenv("CATALOG_DETAIL_CACHE_SIZE", "10000"))
 )
-from collections import Counter
-from datetime import datetime
+# Articles written by other processes are picked up this often, and
+# articles they deleted or re-categorised this often
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "30"))
+CATALOG_RECONCILE_SECONDS = float(os.getenv("CATALOG_RECONCILE_SECONDS", "600"))
+
+@instrument("logic", "get_article_catalog")
+def get_article_catalog():
+    """
+    Return the in-process article catalog, loading it on first use,
+    reading articles past its watermark every CATALOG_REFRESH_SECONDS and
+    reconciling it with storage every CATALOG_RECONCILE_SECONDS
+    """
+    if not article_catalog.loaded and swap_snapshot():
+        refresh_indexes()
+    article_catalog.ensure_loaded(
+        lambda: (article for rows in iter_articles(fields="meta") for article in rows)
+    )
+    if article_catalog.claim_refresh(CATALOG_REFRESH_SECONDS):
+        swap_snapshot()
+        refresh_indexes()
+    if article_catalog.claim_reconcile(CATALOG_RECONCILE_SECONDS):
+        reconcile_indexes()
+    return article_catalog
+
+def refresh_indexes():
+    """
+    Feed articles newer than the catalog's watermark to every loaded index
+    """
+    for rows in iter_articles_after(article_catalog.watermark, fields="text"):
+        for article in rows:
+            _on_article_change("create", article)
+        article_catalog.advance_watermark(rows[-1]["article_id"])
+        if duplicate_index.loaded:
+            duplicate_index.advance_watermark(rows[-1]["article_id"])
+
+def reconcile_indexes():
+    """
+    Re-read every article's id, category and publish time, drop articles
+    another process deleted from every loaded index and re-read those it
+    moved. Edits to only the title or content are not detected here
+    """
+    stored, up_to = {}, None
+    for rows in iter_articles_after(chunk_size=5000, fields="meta"):
+        for row in rows:
+            stored[row["article_id"]] = (row["category_id"], row["published_at"])
+        up_to = rows[-1]["article_id"]
+    # Rows inserted after the scan passed their id are left for the next one
+    missing, changed = article_catalog.diff(stored, float("inf") if up_to is None else up_to)
+    for article_id in missing:
+        _on_article_change("delete", {"article_id": article_id})
+    for i in range(0, len(changed), 500):
+        for article in get_articles_by_ids(changed[i:i + 500], fields="text").data or []:
+            _on_article_change("update", article)
+
+def stored_article_ids(article_ids):
+    """
+    The subset of article_ids still in storage; the others were deleted by
+    another process since the last reconcile and are dropped from every
+    loaded index
+    """
+    article_ids = list(set(article_ids))
+    found = set()
+    for i in range(0, len(article_ids), 500):
+        rows = get_articles_by_ids(article_ids[i:i + 500], fields="id_category").data or []
+        found.update(row["article_id"] for row in rows)
+    for article_id in set(article_ids) - found:
+        _on_article_change("delete", {"article_id": article_id})
+    return found
+
+# ------------------------
+# CONTENT RANKING
+# ------------------------
+ranking_engine = RankingEngine()
+
+@instrument("logic", "get_ranking_engine")
+def get_ranking_engine():
+    """
+    Return the TF-IDF ranking engine, vectorizing the catalog on first use
+    """
+    if not ranking_engine.loaded and swap_snapshot():
+        refresh_indexes()
+    return ranking_engine.ensure_loaded(
+        lambda: (article for rows in iter_articles(fields="text") for article in rows)
+    )
+
+# ------------------------
+# CATALOG SNAPSHOT
+# ------------------------
+# With SNAPSHOT_PATH set, the catalog and ranking engine are mapped from the
+# file `python -m src.snapshot` writes instead of being loaded from the
+# database, and a rebuilt file is swapped in at the next catalog refresh
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH")
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+def swap_snapshot():
+    """
+    Map the snapshot at SNAPSHOT_PATH into the catalog and ranking engine if
+    it is newer than the one they hold; True when it was swapped in
+    """
+    global _snapshot
+    if not SNAPSHOT_PATH:
+        return False
+    with _snapshot_lock:
+        snapshot = open_if_changed(SNAPSHOT_PATH, _snapshot)
+        if snapshot is None or (_snapshot is not None and snapshot.version <= _snapshot.version):
+            return False
+        article_catalog.load_snapshot(snapshot)
+        ranking_engine.load_snapshot(snapshot)
+        _snapshot = snapshot
+        return True
+
+# From ANN_MIN_ARTICLES on, the recommender re-scores only ANN_CANDIDATES
+# articles found by reading at most ANN_POSTING_BUDGET postings of the
+# profile's terms, heaviest first, instead of scoring the whole catalog.
+# The budget is the recall-vs-latency knob (see benchmarks/ann.py)
+ANN_MIN_ARTICLES = int(os.getenv("ANN_MIN_ARTICLES", "50000"))
+ANN_CANDIDATES = int(os.getenv("ANN_CANDIDATES", "200"))
+ANN_POSTING_BUDGET = int(os.getenv("ANN_POSTING_BUDGET", "50000"))
+
+# ------------------------
+# NEAR-DUPLICATE DETECTION
+# ------------------------
+# "reject" refuses near-duplicates at ingest; "cluster" stores them and
+# lets the recommender return one article per cluster
+DEDUPE_MODE = os.getenv("DEDUPE_MODE", "cluster")
+duplicate_index = DuplicateIndex(
+    path=os.getenv("DEDUPE_INDEX_PATH", "dedupe_index.npz"),
+    save_interval=float(os.getenv("DEDUPE_SAVE_SECONDS", "30"))
+)
+
+@instrument("logic", "get_duplicate_index")
+def get_duplicate_index():
+    """
+    Return the MinHash/LSH index, loading the saved copy (plus articles
+    added since it was saved) or hashing the catalog on first use
+    """
+    return duplicate_index.ensure_loaded(
+        lambda: (article for rows in iter_articles(fields="text") for article in rows),
+        lambda after_id: (article for rows in iter_articles_after(after_id, fields="text") for article in rows)
+    )
+
+def _on_article_change(event, article):
+    # An unloaded index picks up every change when it is first loaded
+    for index in (article_catalog, ranking_engine, duplicate_index):
+        if not index.loaded:
+            continue
+        if event == "delete":
+            index.remove(article["article_id"])
+        else:
+            index.upsert(article)
+
+subscribe_article_changes(_on_article_change)
+
+# ------------------------
+# COLLABORATIVE FILTERING
+# ------------------------
+# Articles read by the same users, blended into rank() with CF_WEIGHT. The
+# seeds are the user's CF_MAX_SEEDS most recent positively weighted articles,
+# the same interactions ItemSimilarity builds its pairs from
+CF_WEIGHT = float(os.getenv("CF_WEIGHT", "0.5"))
+CF_MAX_SEEDS = int(os.getenv("CF_MAX_SEEDS", "50"))
+item_similarity = ItemSimilarity(
+    history_loader=get_interactions_for_users,
+    max_neighbors=int(os.getenv("CF_MAX_NEIGHBORS", "50")),
+    window=int(os.getenv("CF_WINDOW", "20")),
+    shrink=float(os.getenv("CF_SHRINK", "5"))
+)
+
+def cf_seeds(interactions):
+    """
+    Up to CF_MAX_SEEDS distinct article ids of positive-weight interaction
+    rows, most recent interaction first
+    """
+    seeds = {}
+    for row in sorted(
+        interactions, reverse=True,
+        key=lambda row: (parse_time(row.get("interaction_time")), row.get("interaction_id") or 0)
+    ):
+        if interaction_weight(row.get("interaction_type")) > 0:
+            seeds.setdefault(row["article_id"], None)
+            if len(seeds) >= CF_MAX_SEEDS:
+                break
+    return list(seeds)
+
+@instrument("logic", "get_item_similarity")
+def get_item_similarity():
+    """
+    Return the item-item co-occurrence index, building it on first use in
+    one pass over User_Interactions, a chunk of users at a time
+    """
+    return item_similarity.ensure_loaded(
+        lambda: (row for user_ids in iter_user_ids() for row in get_interactions_for_users(user_ids))
+    )
+
+# ------------------------
+# TRENDING
+# ------------------------
+# Interaction weight per article and category over sliding windows, e.g.
+# TRENDING_WINDOWS='{"1h": 3600, "24h": 86400}'. Users without a profile
+# are served what is trending over TRENDING_COLD_START_WINDOW
+TRENDING_WINDOWS = json.loads(os.getenv("TRENDING_WINDOWS", '{"1h": 3600, "24h": 86400}'))
+TRENDING_COLD_START_WINDOW = os.getenv("TRENDING_COLD_START_WINDOW", "24h")
+trending = Trending(
+    category_of=article_catalog.category_of,
+    windows=TRENDING_WINDOWS,
+    buckets=int(os.getenv("TRENDING_BUCKETS", "60")),
+    capacity=int(os.getenv("TRENDING_CAPACITY", "10000"))
+)
+
+@instrument("logic", "get_trending")
+def get_trending():
+    """
+    Return the trending counters, counting the interactions of the longest
+    window from User_Interactions on first use
+    """
+    get_article_catalog()
+    return trending.ensure_loaded(
+        lambda since: (
+            row for rows in iter_interactions_since(datetime.fromtimestamp(since, timezone.utc)) for row in rows
+        )
+    )
+
+def _on_interactions(rows):
+    # Unloaded indexes read these from the table when they are first built
+    if item_similarity.loaded:
+        item_similarity.add_interactions(rows)
+    if trending.loaded:
+        trending.add_interactions(rows)
 
 # ------------------------
 # USERS
 # ------------------------
+@instrumented("logic")
 class UserLogic:
     def add_user(self, username):
         if not username:
@@ -38,6 +304,7 @@ class UserLogic:
 # ------------------------
 # CATEGORIES
 # ------------------------
+@instrumented("logic")
 class CategoryLogic:
     def add_category(self, name):
         if not name:
@@ -56,14 +323,89 @@ class CategoryLogic:
 # ------------------------
 # ARTICLES
 # ------------------------
+@instrumented("logic")
 class ArticleLogic:
     def add_article(self, title, content, source, url, category_id, published_at):
         if not title or not content:
             return {"success": False, "message": "Title and content are required"}
+        if DEDUPE_MODE == "reject":
+            duplicate = get_duplicate_index().find_duplicate(minhash(content))
+            if duplicate:
+                return {"success": False, "message": f"Near-duplicate of article {duplicate[0]}"}
+        # In cluster mode the change listener files the new row under its cluster
         return create_article(title, content, source, url, category_id, published_at)
 
-    def list_articles(self):
-        return get_all_articles()
+    def add_articles(self, articles):
+        """
+        Validate and insert a batch of article dicts with one bulk insert.
+        Returns the inserted count and per-row errors keyed by position in
+        articles; errors from a failed insert are marked retryable
+        """
+        errors, valid = [], []
+        # Rows accepted so far in this batch, keyed by position, so two
+        # near-duplicates in one request don't both get in
+        batch_index = DuplicateIndex()
+        for i, article in enumerate(articles):
+            if not article.get("title") or not article.get("content"):
+                errors.append({"index": i, "message": "Title and content are required"})
+                continue
+            if DEDUPE_MODE == "reject":
+                signature = minhash(article["content"])
+                duplicate = get_duplicate_index().find_duplicate(signature)
+                if duplicate:
+                    errors.append({"index": i, "message": f"Near-duplicate of article {duplicate[0]}"})
+                    continue
+                duplicate = batch_index.find_duplicate(signature)
+                if duplicate:
+                    errors.append({"index": i, "message": f"Near-duplicate of row {duplicate[0]} in this batch"})
+                    continue
+                batch_index.upsert({"article_id": i, "content": article["content"]}, signature)
+            valid.append((i, article))
+
+        inserted = 0
+        if valid:
+            try:
+                inserted = len(create_articles([article for _, article in valid]).data or [])
+            except Exception as exc:
+                errors.extend({"index": i, "message": f"Insert failed: {exc}", "retryable": True}
+                              for i, _ in valid)
+        return {"success": True, "inserted": inserted, "errors": sorted(errors, key=lambda e: e["index"])}
+
+    def list_articles(self, fields="full"):
+        return get_all_articles(fields)
+
+    def list_articles_page(self, limit=50, cursor=None, fields="summary"):
+        try:
+            after = _decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return {"success": False, "message": "Invalid cursor"}
+        if fields not in CATALOG_VIEWS:
+            rows = get_articles_page(limit, after, fields).data or []
+            next_cursor = _encode_cursor(rows[-1]) if len(rows) == limit else None
+            return {"success": True, "data": rows, "next_cursor": next_cursor}
+
+        # Served from the catalog's time index; only summaries need a
+        # (cached) detail lookup
+        catalog = get_article_catalog()
+        rows = [
+            row for row in catalog.rows(catalog.page(limit, after), details=fields == "summary")
+            if row is not None
+        ]
+        next_cursor = _encode_cursor(rows[-1]) if len(rows) == limit else None
+        columns = CATALOG_VIEWS[fields]
+        return {
+            "success": True,
+            "data": [{column: row[column] for column in columns} for row in rows],
+            "next_cursor": next_cursor
+        }
+
+    def stream_articles(self, chunk_size=500, fields="summary"):
+        """
+        Yield every article as an NDJSON line, reading the table chunk by chunk
+        """
+        for rows in iter_articles(chunk_size, fields):
+            for row in rows:
+                yield json.dumps(row, default=str) + "\n"
 
     def update_article(self, article_id, **kwargs):
         return update_article(article_id, **kwargs)
@@ -71,56 +413,484 @@ class ArticleLogic:
     def delete_article(self, article_id):
         return delete_article(article_id)
 
+# Article views whose columns the catalog holds, in src.db.ARTICLE_VIEWS order
+CATALOG_VIEWS = {
+    "summary": ("article_id", "title", "source", "url", "category_id", "published_at"),
+    "id_category": ("article_id", "category_id"),
+    "meta": ("article_id", "category_id", "published_at"),
+}
+
+# Cursors carry published_at as a fixed-width UTC ISO string, so one from
+# a catalog-served page works on a database-served one and vice versa
+def _encode_cursor(article):
+    raw = json.dumps([from_micros(to_micros(article["published_at"])), article["article_id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor):
+    try:
+        published_at, article_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        micros = to_micros(published_at)
+        if micros == MISSING_TIME and published_at is not None:
+            raise ValueError(published_at)
+        return from_micros(micros), int(article_id)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
 # ------------------------
 # USER INTERACTIONS
 # ------------------------
+@instrumented("logic")
 class InteractionLogic:
     def add_interaction(self, user_id, article_id, interaction_type):
-        return add_interaction(user_id, article_id, interaction_type)
+        result = add_interaction(user_id, article_id, interaction_type)
+        ProfileLogic().record_interaction(user_id, article_id, interaction_weight(interaction_type))
+        _on_interactions([{"user_id": user_id, "article_id": article_id, "interaction_type": interaction_type}])
+        return result
 
-    def get_interactions(self, user_id):
-        return get_user_interactions_with_articles(user_id)
+    def queue_interaction(self, user_id, article_id, interaction_type):
+        """
+        Accept an interaction for write-behind; raises BufferFull when saturated.
+        Unknown users and articles are refused here, since the batch insert
+        would otherwise fail after the client was told it was accepted
+        """
+        if not user_exists(user_id):
+            return {"success": False, "message": f"User {user_id} not found"}
+        if article_id not in get_article_catalog() and not get_articles_by_ids([article_id], fields="id_category").data:
+            return {"success": False, "message": f"Article {article_id} not found"}
+        interaction_buffer.put({
+            "user_id": user_id,
+            "article_id": article_id,
+            "interaction_type": interaction_type,
+            "interaction_time": datetime.now(timezone.utc).isoformat()
+        })
+        return {"success": True, "message": "Interaction accepted"}
+
+    def get_interactions(self, user_id, fields="full"):
+        return get_user_interactions_with_articles(user_id, fields)
+
+# ------------------------
+# USER PROFILES
+# ------------------------
+# Profile writes are compare-and-set on the row's version; a write that
+# loses to another worker re-reads the profile and folds again, this many times
+PROFILE_UPDATE_ATTEMPTS = int(os.getenv("PROFILE_UPDATE_ATTEMPTS", "5"))
+
+@instrumented("logic")
+class ProfileLogic:
+    def get_profile(self, user_id):
+        return self.from_stored(user_id, get_user_profile(user_id).data)
+
+    def get_profiles(self, user_ids):
+        """
+        Profiles and interaction histories of many users in two queries.
+        Users without a stored profile get one built from their history.
+        Returns ({user_id: UserProfile}, {user_id: [interaction rows]}, newly built profile rows)
+        """
+        profiles = {row["user_id"]: UserProfile.from_row(row) for row in get_user_profiles(user_ids).data or []}
+        history = {}
+        for row in get_interactions_for_users(user_ids):
+            history.setdefault(row["user_id"], []).append(row)
+
+        built = []
+        for user_id in user_ids:
+            if user_id not in profiles and user_id in history:
+                profiles[user_id] = self.build_profile(user_id, history[user_id])
+                built.append(profiles[user_id].to_row())
+        return profiles, history, built
+
+    def rebuild_profile(self, user_id):
+        """
+        Replay a user's interaction history into a fresh profile and persist
+        it unless the user already has one. Only needed for users whose
+        history predates User_Profiles
+        """
+        history = get_user_interactions(user_id).data or []
+        profile = self.build_profile(user_id, history)
+        if history:
+            insert_user_profiles([profile.to_row()])
+        return profile
+
+    def build_profile(self, user_id, history):
+        """
+        Build a profile from interaction rows ({article_id, interaction_type,
+        interaction_time}) without DB calls
+        """
+        catalog = get_article_catalog()
+        engine = get_ranking_engine()
+        history = sorted(history, key=lambda item: parse_time(item.get("interaction_time")))
+        profile = UserProfile(user_id, updated_at=parse_time(history[0]["interaction_time"]) if history else None)
+        for item in history:
+            if item["article_id"] not in catalog:
+                continue
+            profile.add(
+                catalog.category_of(item["article_id"]),
+                engine.vector(item["article_id"]),
+                interaction_weight(item.get("interaction_type")),
+                when=parse_time(item.get("interaction_time"))
+            )
+        return profile
+
+    def record_interaction(self, user_id, article_id, weight=1.0, when=None):
+        """
+        Fold one new interaction into the user's stored profile
+        """
+        if article_id not in get_article_catalog():
+            return None
+        return self._fold(user_id, [{"article_id": article_id, "weight": weight, "when": when}])
+
+    def record_interactions(self, interactions):
+        """
+        Fold a batch of interaction rows into their users' profiles,
+        reading and writing each affected profile once; a user whose
+        profile can't be written does not hold up the others
+        """
+        by_user = {}
+        for row in sorted(interactions, key=lambda row: parse_time(row.get("interaction_time"))):
+            by_user.setdefault(row["user_id"], []).append({
+                "article_id": row["article_id"],
+                "weight": interaction_weight(row.get("interaction_type")),
+                "when": parse_time(row.get("interaction_time")),
+            })
+        for user_id, folds in by_user.items():
+            try:
+                self._fold(user_id, folds)
+            except Exception:
+                logger.exception("profile of user %s not updated", user_id)
+
+    def from_stored(self, user_id, rows):
+        """
+        The profile of user_id from its User_Profiles rows, rebuilt from the
+        interaction history when there are none
+        """
+        if rows:
+            return UserProfile.from_row(rows[0])
+        return self.rebuild_profile(user_id)
+
+    def _fold(self, user_id, folds):
+        # Read, fold and compare-and-set write the profile, again from a
+        # fresh read whenever another worker wrote it in between
+        catalog = get_article_catalog()
+        engine = get_ranking_engine()
+        for _ in range(PROFILE_UPDATE_ATTEMPTS):
+            rows = get_user_profile(user_id).data
+            if not rows:
+                # The replayed history already holds the interactions just
+                # written, and so does any profile a concurrent rebuild stored
+                return self.rebuild_profile(user_id)
+            profile = UserProfile.from_row(rows[0])
+            for fold in folds:
+                if fold["article_id"] in catalog:
+                    profile.add(
+                        catalog.category_of(fold["article_id"]), engine.vector(fold["article_id"]),
+                        fold["weight"], fold["when"]
+                    )
+            if update_user_profile(profile.to_row(), profile.version).data:
+                profile.version += 1
+                return profile
+        raise RuntimeError(f"Profile of user {user_id} changed on each of {PROFILE_UPDATE_ATTEMPTS} attempts")
+
+# ------------------------
+# INTERACTION WRITE-BEHIND
+# ------------------------
+# POST /interactions is acknowledged as soon as the row is queued; rows are
+# bulk-inserted by a background flusher and then folded into profiles
+interaction_buffer = WriteBehindBuffer(
+    add_interactions,
+    max_batch=int(os.getenv("INTERACTION_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("INTERACTION_FLUSH_SECONDS", "1.0")),
+    max_pending=int(os.getenv("INTERACTION_MAX_PENDING", "10000"))
+)
+interaction_buffer.subscribe(lambda rows: ProfileLogic().record_interactions(rows))
+interaction_buffer.subscribe(_on_interactions)
+
+# ------------------------
+# RECOMMENDATION RETENTION
+# ------------------------
+# Each generate call replaces the user's previous generation; the sweeper
+# deletes whatever a newer generation superseded (e.g. rows added one by
+# one) and generations older than RECOMMENDATION_RETENTION_DAYS (0 keeps them)
+recommendation_sweeper = RetentionSweeper(
+    expire_recommendations,
+    max_age_days=float(os.getenv("RECOMMENDATION_RETENTION_DAYS", "30")),
+    interval=float(os.getenv("RECOMMENDATION_SWEEP_SECONDS", "3600")),
+    batch_size=int(os.getenv("RECOMMENDATION_SWEEP_BATCH", "1000"))
+)
 
 # ------------------------
 # RECOMMENDATIONS
 # ------------------------
+@instrumented("logic")
 class RecommendationLogic:
     def add_recommendation(self, user_id, article_id, score):
         return add_recommendation(user_id, article_id, score)
 
-    def get_recommendations(self, user_id):
-        return get_user_recommended_articles(user_id)
+    def get_recommendations(self, user_id, fields="full", limit=20):
+        """
+        The user's newest generation of recommendations, best score first
+        """
+        rows = get_user_recommended_articles(user_id, fields).data or []
+        return {"success": True, "data": rows[:limit]}
 
     # ------------------------
     # PERSONALIZATION LOGIC
     # ------------------------
     def generate_recommendations(self, user_id, top_n=5):
-        interactions = InteractionLogic().get_interactions(user_id)
-        if not interactions.get("data"):
-            return {"success": True, "recommendations": []}
-
-        categories = [item["Articles"]["category_id"] for item in interactions["data"]]
-        category_counts = Counter(categories)
-        preferred_categories = [cat for cat, _ in category_counts.most_common()]
-
-        all_articles = ArticleLogic().list_articles()
-        if not all_articles.get("data"):
-            return {"success": True, "recommendations": []}
-
-        interacted_article_ids = {item["Articles"]["article_id"] for item in interactions["data"]}
-
-        recommended = []
-        for cat in preferred_categories:
-            for article in all_articles["data"]:
-                if article["category_id"] == cat and article["article_id"] not in interacted_article_ids:
-                    recommended.append(article)
-                    if len(recommended) >= top_n:
-                        break
-            if len(recommended) >= top_n:
+        profile = ProfileLogic().get_profile(user_id)
+        return self.recommend(user_id, profile, self.get_interactions(user_id), top_n)
+
+    def recommend(self, user_id, profile, interactions, top_n=5):
+        """
+        Rank (or cold-start) and save one user's recommendations from the
+        already fetched profile and interaction rows
+        """
+        interacted_article_ids = {row["article_id"] for row in interactions}
+        if profile.is_empty():
+            if not user_exists(user_id):
+                return {"success": False, "message": f"User {user_id} not found"}
+            recommended = self.cold_start(interacted_article_ids, top_n)
+        else:
+            recommended = self.rank(profile, interacted_article_ids, top_n, seeds=cf_seeds(interactions))
+        # The indexes can still hold an article deleted elsewhere, which the write would refuse
+        stored = stored_article_ids(article["article_id"] for article in recommended)
+        recommended = [article for article in recommended if article["article_id"] in stored]
+        self.save_recommendations(user_id, recommended)
+        return {"success": True, "recommendations": recommended}
+
+    def get_interactions(self, user_id):
+        """
+        article_id, interaction_type and interaction_time of each of the user's interactions
+        """
+        return get_user_interacted_article_ids(user_id).data or []
+
+    def rank(self, profile, interacted_article_ids, top_n=5, details=True, seeds=()):
+        """
+        Pick the top_n unseen articles for a profile, blending in articles
+        read together with the seeds (see cf_seeds); once the catalog and
+        ranking engine are loaded the only DB call is for titles, sources
+        and urls missing from the catalog's cache, skipped without details
+        """
+        category_share = profile.category_share()
+
+        # Over-fetch so dropping near-duplicates still leaves top_n articles
+        limit = top_n * 3
+
+        # Score = (cosine similarity to the user's TF-IDF profile + category share)
+        # x article freshness; the profile itself is decayed by interaction time
+        catalog = get_article_catalog()
+        engine = get_ranking_engine()
+        query = profile.term_vector()
+        if query is not None and len(engine) >= ANN_MIN_ARTICLES:
+            # Category share can outweigh text similarity, so the newest
+            # articles of the user's categories are candidates too
+            candidates = set(engine.candidates(
+                query, ANN_CANDIDATES, ANN_POSTING_BUDGET, exclude=interacted_article_ids
+            ))
+            for cat in category_share:
+                candidates.update(
+                    article_id for article_id, _ in catalog.newest(cat, exclude=interacted_article_ids, limit=limit)
+                )
+            ranked = select_top(
+                engine.score(query, candidates, boost=category_share, half_life_days=ARTICLE_HALF_LIFE_DAYS),
+                limit
+            )
+        elif query is not None:
+            ranked = engine.rank(
+                query, limit, exclude=interacted_article_ids, boost=category_share,
+                half_life_days=ARTICLE_HALF_LIFE_DAYS
+            )
+        else:
+            # No text to compare against: category share x freshness over the
+            # newest articles of each preferred category
+            ranked = select_top(
+                (
+                    (article_id, share * freshness(published))
+                    for cat, share in category_share.items()
+                    for article_id, published in catalog.newest(cat, exclude=interacted_article_ids, limit=limit)
+                ),
+                limit
+            )
+
+        # Add CF_WEIGHT x item-item similarity to the ranked articles; articles
+        # only CF found are scored like the rest first
+        similar = {}
+        if CF_WEIGHT and seeds:
+            similar = get_item_similarity().recommend(seeds, limit, exclude=interacted_article_ids)
+        if similar:
+            scores = dict(ranked)
+            unscored = [article_id for article_id in similar if article_id not in scores and article_id in catalog]
+            if query is not None:
+                scores.update(engine.score(
+                    query, unscored, boost=category_share, half_life_days=ARTICLE_HALF_LIFE_DAYS
+                ))
+            else:
+                for article in catalog.rows(unscored, details=False):
+                    if article is not None:
+                        scores[article["article_id"]] = (
+                            category_share.get(article["category_id"], 0.0)
+                            * freshness(to_epoch(article["published_at"]))
+                        )
+            ranked = select_top(
+                ((article_id, score + CF_WEIGHT * similar.get(article_id, 0.0)) for article_id, score in scores.items()),
+                limit
+            )
+
+        return self._pick(ranked, interacted_article_ids, top_n, details)
+
+    def cold_start(self, interacted_article_ids, top_n=5, details=True):
+        """
+        Pick the top_n articles for a user without a profile: the most
+        interacted-with over TRENDING_COLD_START_WINDOW, then the newest
+        """
+        limit = top_n * 3
+        ranked = [
+            (article_id, score)
+            for article_id, score in get_trending().top_articles(
+                TRENDING_COLD_START_WINDOW, limit + len(interacted_article_ids)
+            )
+            if article_id not in interacted_article_ids
+        ]
+        if len(ranked) < limit:
+            trending_ids = {article_id for article_id, _ in ranked}
+            ranked += [
+                (article_id, 0.0)
+                for article_id in get_article_catalog().page(limit + len(interacted_article_ids))
+                if article_id not in interacted_article_ids and article_id not in trending_ids
+            ]
+        return self._pick(ranked, interacted_article_ids, top_n, details)
+
+    def _pick(self, ranked, interacted_article_ids, top_n, details):
+        catalog = get_article_catalog()
+
+        # One article per duplicate cluster, skipping clusters the user has already read
+        duplicates = get_duplicate_index()
+        seen_clusters = {duplicates.cluster_of(article_id) for article_id in interacted_article_ids}
+        picked = []
+        for article_id, score in ranked:
+            cluster = duplicates.cluster_of(article_id)
+            if cluster in seen_clusters or article_id not in catalog:
+                continue
+            seen_clusters.add(cluster)
+            picked.append((article_id, score))
+            if len(picked) >= top_n:
                 break
+        articles = catalog.rows([article_id for article_id, _ in picked], details=details)
+        return [
+            {**article, "score": score}
+            for article, (_, score) in zip(articles, picked) if article is not None
+        ]
 
-        # Save recommendations to DB
-        for article in recommended:
-            self.add_recommendation(user_id, article["article_id"], score=1.0)
+    def generate_for_users(self, user_ids, top_n=5):
+        """
+        Generate and save recommendations for a chunk of users with one
+        grouped read of their profiles and interactions and one bulk write.
+        Returns {user_id: result} in generate_recommendations()' shape; a
+        user that is unknown or fails does not affect the others
+        """
+        profiles, history, built = ProfileLogic().get_profiles(user_ids)
+        if built:
+            insert_user_profiles(built)
 
-        return {"success": True, "recommendations": recommended}
+        results, rows = {}, []
+        for user_id in user_ids:
+            profile = profiles.get(user_id)
+            seen = {row["article_id"] for row in history.get(user_id, [])}
+            try:
+                if profile is None or profile.is_empty():
+                    if user_id not in history and not user_exists(user_id):
+                        results[user_id] = {"success": False, "message": f"User {user_id} not found"}
+                        continue
+                    recommended = self.cold_start(seen, top_n)
+                else:
+                    recommended = self.rank(profile, seen, top_n, seeds=cf_seeds(history.get(user_id, [])))
+            except Exception as exc:
+                results[user_id] = {"success": False, "message": str(exc)}
+                continue
+            results[user_id] = {"success": True, "recommendations": recommended}
+
+        # One lookup for every picked article, dropping any deleted elsewhere
+        stored = stored_article_ids(
+            article["article_id"] for result in results.values() if result["success"]
+            for article in result["recommendations"]
+        )
+        for user_id, result in results.items():
+            if not result["success"]:
+                continue
+            result["recommendations"] = [a for a in result["recommendations"] if a["article_id"] in stored]
+            rows.extend(
+                {"user_id": user_id, "article_id": article["article_id"], "score": article["score"]}
+                for article in result["recommendations"]
+            )
+        if rows:
+            try:
+                upsert_recommendations_bulk(rows)
+            except Exception:
+                # Find the users whose rows can't be written and keep the rest
+                for user_id, result in results.items():
+                    if not result["success"]:
+                        continue
+                    try:
+                        self.save_recommendations(user_id, result["recommendations"])
+                    except Exception as exc:
+                        results[user_id] = {"success": False, "message": str(exc)}
+        return results
+
+    def stream_generate(self, user_ids=None, start_user=None, end_user=None, top_n=5, chunk_size=500):
+        """
+        Generate recommendations for a list of user ids or the range
+        [start_user, end_user), yielding one NDJSON line per user as each
+        chunk finishes. Every chunk ranks against the same in-memory catalog
+        """
+        if user_ids is not None:
+            user_ids = list(dict.fromkeys(user_ids))
+            chunks = (user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size))
+        else:
+            chunks = iter_user_ids(start_user, end_user, chunk_size)
+        for chunk in chunks:
+            for user_id, result in self.generate_for_users(chunk, top_n).items():
+                if result["success"]:
+                    line = {"user_id": user_id, "recommendations": result["recommendations"]}
+                else:
+                    line = {"user_id": user_id, "error": result["message"]}
+                yield json.dumps(line, default=str) + "\n"
+
+    def save_recommendations(self, user_id, recommended):
+        # Save recommendations to DB in one bulk write
+        return upsert_recommendations(user_id, [
+            {"article_id": article["article_id"], "score": article["score"]} for article in recommended
+        ])
+
+# ------------------------
+# TRENDING
+# ------------------------
+@instrumented("logic")
+class TrendingLogic:
+    def get_trending(self, window="24h", limit=20, category_id=None):
+        """
+        Articles with the most interaction weight over window, optionally
+        only those of category_id, highest first
+        """
+        counters = get_trending()
+        if window not in counters.windows:
+            return {"success": False, "message": f"Unknown window, expected one of {sorted(counters.windows)}"}
+        catalog = get_article_catalog()
+        ranked = counters.top_articles(window, counters.top_size if category_id is not None else limit)
+        if category_id is not None:
+            ranked = [(article_id, score) for article_id, score in ranked
+                      if catalog.category_of(article_id) == category_id][:limit]
+        articles = catalog.rows([article_id for article_id, _ in ranked])
+        return {"success": True, "data": [
+            {**article, "score": score}
+            for article, (_, score) in zip(articles, ranked) if article is not None
+        ]}
+
+    def get_trending_categories(self, window="24h", limit=20):
+        """
+        Categories with the most interaction weight over window, highest first
+        """
+        counters = get_trending()
+        if window not in counters.windows:
+            return {"success": False, "message": f"Unknown window, expected one of {sorted(counters.windows)}"}
+        return {"success": True, "data": [
+            {"category_id": category_id, "score": score}
+            for category_id, score in counters.top_categories(window, limit)
+        ]}
@@ -0,0 +1,290 @@
+# src/metrics.py
+"""
+In-process metrics with Prometheus text exposition.
+
+Every src.db function and logic method is wrapped by instrument(), which
+records a latency histogram per function and, while a request is being
+traced, adds the call to that request's RequestTrace so one slow request
+can be broken down by where its time went.
+"""
+import contextvars
+import functools
+import inspect
+import math
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# ------------------------
+# METRIC TYPES
+# ------------------------
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        with self._lock:
+            return [f"{self.name}{self._labels(k)} {_number(v)}" for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount=1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+
+class ObservedCounter(Counter):
+    """
+    A counter whose running total is kept elsewhere (a buffer's or cache's
+    own tally) and copied in by an on_collect callback with set()
+    """
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # per-bucket counts (not cumulative), then sum and count
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{self._labels(key, [('le', _number(bound))])} {cumulative}")
+                lines.append(f"{self.name}_bucket{self._labels(key, [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_sum{self._labels(key)} {_number(total)}")
+                lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+
+class Registry:
+    """
+    Holds metrics and renders them in the Prometheus text format.
+    Callbacks registered with on_collect run before each render, for
+    gauges and observed counters that are read from elsewhere (queue
+    depth, cache counters)
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+
+    def _get(self, cls, name, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name, help, labelnames=()):
+        return self._get(Gauge, name, help, labelnames)
+
+    def observed_counter(self, name, help, labelnames=()):
+        return self._get(ObservedCounter, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, labelnames, buckets)
+
+    def on_collect(self, callback):
+        self._collectors.append(callback)
+
+    def render(self):
+        for callback in self._collectors:
+            callback()
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+CALL_SECONDS = registry.histogram(
+    "newsfeed_call_duration_seconds", "Time spent in instrumented functions", ("layer", "function")
+)
+CALL_ERRORS = registry.counter(
+    "newsfeed_call_errors_total", "Instrumented calls that raised", ("layer", "function")
+)
+
+
+# ------------------------
+# REQUEST TRACES
+# ------------------------
+class RequestTrace:
+    """
+    Per-request totals of instrumented calls, keyed by (layer, function).
+    Logic methods include the time of the DB calls they make
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def record(self, layer, function, seconds):
+        with self._lock:
+            entry = self.calls.setdefault((layer, function), [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def count(self, layer):
+        return sum(n for (l, _), (n, _) in list(self.calls.items()) if l == layer)
+
+    def seconds(self, layer):
+        return sum(s for (l, _), (_, s) in list(self.calls.items()) if l == layer)
+
+    def breakdown(self):
+        """
+        {"total_ms", layer: {function: {"calls", "ms"}}}, slowest functions first
+        """
+        result = {"total_ms": round(self.elapsed() * 1000, 3)}
+        for (layer, function), (n, seconds) in sorted(self.calls.items(), key=lambda kv: -kv[1][1]):
+            result.setdefault(layer, {})[function] = {"calls": n, "ms": round(seconds * 1000, 3)}
+        return result
+
+    def server_timing(self):
+        """
+        Server-Timing header value: time in DB calls, the rest of the request and the total
+        """
+        total, db = self.elapsed() * 1000, self.seconds("db") * 1000
+        return (
+            f'db;dur={db:.3f};desc="{self.count("db")} calls", '
+            f"app;dur={max(0.0, total - db):.3f}, total;dur={total:.3f}"
+        )
+
+
+_current_trace = contextvars.ContextVar("request_trace", default=None)
+
+def start_trace():
+    """
+    Start tracing the current context; returns (trace, token for end_trace)
+    """
+    trace = RequestTrace()
+    return trace, _current_trace.set(trace)
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+
+# ------------------------
+# INSTRUMENTATION
+# ------------------------
+def instrument(layer, function):
+    """
+    Decorator recording latency and errors of each call under (layer, function).
+    Generator functions are left alone: the calls they make are timed instead
+    """
+    def decorate(fn):
+        if inspect.isgeneratorfunction(fn):
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                CALL_ERRORS.inc(layer=layer, function=function)
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                CALL_SECONDS.observe(elapsed, layer=layer, function=function)
+                trace = _current_trace.get()
+                if trace is not None:
+                    trace.record(layer, function, elapsed)
+        return wrapper
+    return decorate
+
+def instrument_module(namespace, layer, exclude=()):
+    """
+    Instrument every public function defined in a module, given its globals()
+    """
+    for name, value in list(namespace.items()):
+        if (
+            inspect.isfunction(value) and not name.startswith("_") and name not in exclude
+            and value.__module__ == namespace["__name__"]
+        ):
+            namespace[name] = instrument(layer, name)(value)
+
+def instrumented(layer):
+    """
+    Class decorator instrumenting every public method as "Class.method"
+    """
+    def decorate(cls):
+        for name, value in list(vars(cls).items()):
+            if inspect.isfunction(value) and not name.startswith("_"):
+                setattr(cls, name, instrument(layer, f"{cls.__name__}.{name}")(value))
+        return cls
+    return decorate
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if value.is_integer():
+            return str(int(value))
+    return repr(value)
@@ -0,0 +1,114 @@
+# src/profiles.py
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src.ranking import PROFILE_TERMS
+
+# Interest weights halve after this many days without reinforcement
+HALF_LIFE_DAYS = float(os.getenv("PROFILE_HALF_LIFE_DAYS", "30"))
+
+
+# ------------------------
+# USER PROFILES
+# ------------------------
+class UserProfile:
+    """
+    Exponentially decayed interest weights for one user.
+    category_weights maps category_id -> weight and term_weights maps a
+    hashed TF-IDF bucket -> weight; both are decayed to updated_at.
+    version is the stored row's write counter the profile was read at.
+    """
+
+    def __init__(self, user_id, category_weights=None, term_weights=None,
+                 updated_at=None, half_life_days=HALF_LIFE_DAYS, version=0):
+        self.user_id = user_id
+        self.version = version
+        self.category_weights = category_weights or {}
+        self.term_weights = term_weights or {}
+        self.updated_at = updated_at or datetime.now(timezone.utc)
+        self.half_life_days = half_life_days
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            row["user_id"],
+            category_weights={int(k): v for k, v in (row.get("category_weights") or {}).items()},
+            term_weights={int(k): v for k, v in (row.get("term_weights") or {}).items()},
+            updated_at=parse_time(row.get("updated_at")),
+            version=row.get("version") or 0,
+        )
+
+    def to_row(self):
+        return {
+            "user_id": self.user_id,
+            "category_weights": {str(k): v for k, v in self.category_weights.items()},
+            "term_weights": {str(k): v for k, v in self.term_weights.items()},
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+    def is_empty(self):
+        return not any(w > 0 for w in self.category_weights.values())
+
+    def decay_to(self, when):
+        """
+        Decay every weight from updated_at to when
+        """
+        elapsed_days = (when - self.updated_at).total_seconds() / 86400
+        if elapsed_days <= 0:
+            return
+        factor = 0.5 ** (elapsed_days / self.half_life_days)
+        self.category_weights = {k: v * factor for k, v in self.category_weights.items()}
+        self.term_weights = {k: v * factor for k, v in self.term_weights.items()}
+        self.updated_at = when
+
+    def add(self, category_id, terms=None, weight=1.0, when=None):
+        """
+        Fold one interaction into the profile.
+        terms is the article's (buckets, values) vector from the ranking engine
+        """
+        self.decay_to(when or datetime.now(timezone.utc))
+        if category_id is not None:
+            self.category_weights[category_id] = self.category_weights.get(category_id, 0.0) + weight
+        if terms is not None:
+            for bucket, value in zip(terms[0].tolist(), terms[1].tolist()):
+                self.term_weights[bucket] = self.term_weights.get(bucket, 0.0) + weight * value
+            if len(self.term_weights) > PROFILE_TERMS:
+                strongest = sorted(self.term_weights.items(), key=lambda kv: abs(kv[1]), reverse=True)
+                self.term_weights = dict(strongest[:PROFILE_TERMS])
+
+    def category_share(self):
+        """
+        Positive category weights normalised to sum to 1
+        """
+        positive = {k: v for k, v in self.category_weights.items() if v > 0}
+        total = sum(positive.values())
+        return {k: v / total for k, v in positive.items()} if total else {}
+
+    def term_vector(self):
+        """
+        Normalised (buckets, values) query for RankingEngine.rank, or None
+        """
+        if not self.term_weights:
+            return None
+        buckets = np.fromiter(sorted(self.term_weights), np.int32, len(self.term_weights))
+        values = np.array([self.term_weights[b] for b in buckets.tolist()], np.float32)
+        norm = np.linalg.norm(values)
+        if norm == 0:
+            return None
+        return buckets, values / norm
+
+
+def parse_time(value):
+    """
+    Parse a timestamp returned by the database, defaulting to now
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return datetime.now(timezone.utc)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
@@ -0,0 +1,473 @@
+# src/ranking.py
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from collections.abc import MutableMapping
+from functools import lru_cache
+
+import numpy as np
+
+from src import scoring
+
+# ------------------------
+# TEXT VECTORIZATION
+# ------------------------
+N_FEATURES = 2 ** 18     # size of the hashed vocabulary
+MAX_TERMS = 128          # strongest terms kept per article
+PROFILE_TERMS = 256      # strongest terms kept per user profile
+
+_TOKEN_RE = re.compile(r"[a-z0-9]{2,}")
+
+def hash_terms(text, n_features=N_FEATURES, max_terms=MAX_TERMS):
+    """
+    Hash the tokens of text into feature buckets.
+    Returns (buckets, log-scaled term counts) for the max_terms most frequent buckets
+    """
+    tokens = Counter(_TOKEN_RE.findall((text or "").lower()))
+    if not tokens:
+        return np.empty(0, np.int32), np.empty(0, np.float32)
+    hashes = np.fromiter(map(_token_hash, tokens), np.int64, len(tokens))
+    buckets, inverse = np.unique(hashes % n_features, return_inverse=True)
+    counts = np.bincount(inverse, weights=np.fromiter(tokens.values(), np.float64, len(tokens)))
+    if len(buckets) > max_terms:
+        keep = np.sort(np.argpartition(-counts, max_terms)[:max_terms])
+        buckets, counts = buckets[keep], counts[keep]
+    return buckets.astype(np.int32), (1.0 + np.log(counts)).astype(np.float32)
+
+@lru_cache(maxsize=2 ** 18)
+def _token_hash(token):
+    # crc32 rather than hash() so buckets are stable across processes
+    return zlib.crc32(token.encode())
+
+
+# ------------------------
+# RANKING ENGINE
+# ------------------------
+class RankingEngine:
+    """
+    Hashing TF-IDF index over article title + content.
+    Rows are L2-normalised and stored column-major, so scoring a sparse
+    profile vector is one batched product over the postings of its terms.
+    Articles written after the last build are scored separately until
+    compact_every of them have piled up and the matrix is rebuilt.
+    load_snapshot() maps the vectors and matrix from a src.snapshot file
+    instead of vectorizing; they stay shared with other processes until
+    that rebuild copies them.
+    """
+
+    def __init__(self, n_features=N_FEATURES, compact_every=1024):
+        self.n_features = n_features
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._terms = {}        # article_id -> (buckets, tf)
+        self._categories = {}   # article_id -> category_id
+        self._published = {}    # article_id -> published_at as epoch seconds
+        self._pending = set()   # article ids written since the last build
+        self._matrix = None
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._terms)
+
+    def ensure_loaded(self, loader):
+        """
+        Vectorize the articles yielded by loader() once
+        """
+        if self.loaded:
+            return self
+        with self._lock:
+            if not self.loaded:
+                self.load(loader())
+        return self
+
+    def load(self, articles):
+        with self._lock:
+            self._terms = {}
+            self._categories = {}
+            self._published = {}
+            for article in articles:
+                self._set(article)
+            self._build()
+            self.loaded = True
+
+    def load_snapshot(self, snapshot):
+        if snapshot.meta["n_features"] != self.n_features:
+            raise ValueError(f"snapshot hashes into {snapshot.meta['n_features']} features, not {self.n_features}")
+        matrix = _Matrix.from_snapshot(snapshot)
+        ptr, cols, tf = snapshot["term_ptr"], snapshot["term_cols"], snapshot["term_tf"]
+        categories, published = snapshot["category_ids"], snapshot["published_seconds"]
+        with self._lock:
+            self._terms = _Overlay(matrix.row_of, lambda row: (cols[ptr[row]:ptr[row + 1]], tf[ptr[row]:ptr[row + 1]]))
+            self._categories = _Overlay(matrix.row_of, lambda row: None if categories[row] == -1 else int(categories[row]))
+            self._published = _Overlay(matrix.row_of, lambda row: float(published[row]))
+            self._matrix = matrix
+            self._pending = set()
+            self.loaded = True
+
+    def snapshot_arrays(self):
+        """
+        {name: array} of the vectors and matrix load_snapshot() reads, rebuilt first
+        """
+        with self._lock:
+            if self._matrix is None or self._pending:
+                self._build()
+            matrix = self._matrix
+            ids = matrix.article_ids.tolist()
+            lengths = np.fromiter((len(self._terms[i][0]) for i in ids), np.int64, len(ids))
+            term_ptr = np.zeros(len(ids) + 1, np.int64)
+            np.cumsum(lengths, out=term_ptr[1:])
+            return {
+                "article_ids": matrix.article_ids,
+                "category_ids": matrix.categories,
+                "published_seconds": matrix.published,
+                "id_sorted": matrix.row_of.ids,
+                "id_rows": matrix.row_of.rows,
+                "term_ptr": term_ptr,
+                "term_cols": np.concatenate([self._terms[i][0] for i in ids]) if ids else np.empty(0, np.int32),
+                "term_tf": np.concatenate([self._terms[i][1] for i in ids]) if ids else np.empty(0, np.float32),
+                "idf": matrix.idf,
+                "col_ptr": matrix.col_ptr,
+                "col_rows": matrix.col_rows,
+                "col_weights": matrix.col_weights,
+            }
+
+    def upsert(self, article):
+        with self._lock:
+            article_id = article["article_id"]
+            if "title" not in article and "content" not in article:
+                # Only metadata changed; keep the existing term vector
+                if article_id in self._terms and ("category_id" in article or "published_at" in article):
+                    if "category_id" in article:
+                        self._categories[article_id] = article["category_id"]
+                    if "published_at" in article:
+                        self._published[article_id] = scoring.to_epoch(article["published_at"])
+                    self._mark_pending(article_id)
+                return
+            self._set(article)
+            self._mark_pending(article_id)
+
+    def remove(self, article_id):
+        with self._lock:
+            if self._terms.pop(article_id, None) is not None:
+                self._categories.pop(article_id, None)
+                self._published.pop(article_id, None)
+                self._mark_pending(article_id)
+
+    def vector(self, article_id):
+        """
+        Normalised (buckets, values) TF-IDF vector of one article, or None
+        """
+        with self._lock:
+            if article_id not in self._terms:
+                return None
+            return self._weighted(article_id, self._ensure_matrix().idf)
+
+    def profile(self, article_ids, weights=None):
+        """
+        Build a normalised sparse profile (buckets, values) from the articles a
+        user interacted with, optionally weighting each article.
+        Returns None when none of the articles has any terms
+        """
+        with self._lock:
+            idf = self._ensure_matrix().idf
+            cols, vals = [], []
+            for i, article_id in enumerate(article_ids):
+                if article_id not in self._terms:
+                    continue
+                buckets, weight = self._weighted(article_id, idf)
+                cols.append(buckets)
+                vals.append(weight * (weights[i] if weights is not None else 1.0))
+        if not cols:
+            return None
+        buckets, inverse = np.unique(np.concatenate(cols), return_inverse=True)
+        values = np.bincount(inverse, weights=np.concatenate(vals)).astype(np.float32)
+        if len(buckets) > PROFILE_TERMS:
+            keep = np.sort(np.argpartition(-np.abs(values), PROFILE_TERMS)[:PROFILE_TERMS])
+            buckets, values = buckets[keep], values[keep]
+        norm = np.linalg.norm(values)
+        if norm == 0:
+            return None
+        return buckets.astype(np.int32), values / norm
+
+    def rank(self, query, top_n, exclude=(), boost=None, half_life_days=None):
+        """
+        Return [(article_id, score)] for the top_n articles, where score is the
+        cosine similarity to query plus boost[category_id] when boost is given,
+        scaled by article freshness when half_life_days is given
+        """
+        now = time.time()
+        with self._lock:
+            matrix = self._ensure_matrix()
+            scores = matrix.product(*query)
+            if boost:
+                scores += _lookup(boost, matrix.categories)
+            if half_life_days:
+                scores *= scoring.freshness(matrix.published, now, half_life_days)
+            scores[matrix.stale] = -np.inf
+            for article_id in exclude:
+                row = matrix.row_of.get(article_id)
+                if row is not None:
+                    scores[row] = -np.inf
+
+            ranked = _top(matrix.article_ids, scores, top_n)
+            if self._pending:
+                ranked.extend(self._score_ids(query, matrix.idf, self._pending, exclude, boost, half_life_days, now))
+        return scoring.top_n(ranked, top_n)
+
+    def candidates(self, query, k, budget, exclude=()):
+        """
+        Ids of about k articles likely to rank highest for query, found by
+        reading at most about budget postings instead of every posting of
+        its terms (see _Matrix.top_rows), plus every article written since
+        the last build. Re-score them with score()
+        """
+        with self._lock:
+            matrix = self._ensure_matrix()
+            rows = matrix.top_rows(*query, budget, k + len(exclude))
+            found = [article_id for article_id in matrix.article_ids[rows].tolist() if article_id not in exclude]
+            found = found[:k]
+            found.extend(a for a in self._pending if a in self._terms and a not in exclude)
+        return found
+
+    def score(self, query, article_ids, boost=None, half_life_days=None):
+        """
+        [(article_id, score)] for the given candidates, scored exactly as rank() does
+        """
+        with self._lock:
+            idf = self._ensure_matrix().idf
+            return self._score_ids(query, idf, article_ids, (), boost, half_life_days, time.time())
+
+    # ----- internal -----
+    def _set(self, article):
+        text = f"{article.get('title') or ''} {article.get('content') or ''}"
+        self._terms[article["article_id"]] = hash_terms(text, self.n_features)
+        self._categories[article["article_id"]] = article.get("category_id")
+        self._published[article["article_id"]] = scoring.to_epoch(article.get("published_at"))
+
+    def _mark_pending(self, article_id):
+        self._pending.add(article_id)
+        if self._matrix is not None:
+            row = self._matrix.row_of.get(article_id)
+            if row is not None:
+                self._matrix.stale[row] = True
+
+    def _ensure_matrix(self):
+        if self._matrix is None or len(self._pending) >= self.compact_every:
+            self._build()
+        return self._matrix
+
+    def _build(self):
+        self._matrix = _Matrix(self._terms, self._categories, self._published, self.n_features)
+        self._pending = set()
+
+    def _weighted(self, article_id, idf):
+        buckets, tf = self._terms[article_id]
+        weight = tf * idf[buckets]
+        norm = np.linalg.norm(weight)
+        return buckets, (weight / norm if norm else weight)
+
+    def _score_ids(self, query, idf, article_ids, exclude, boost, half_life_days, now):
+        dense = np.zeros(self.n_features, np.float32)
+        dense[query[0]] = query[1]
+        ranked = []
+        for article_id in article_ids:
+            if article_id in exclude or article_id not in self._terms:
+                continue
+            buckets, weight = self._weighted(article_id, idf)
+            score = float(weight @ dense[buckets])
+            if boost:
+                score += boost.get(self._categories.get(article_id), 0.0)
+            if half_life_days:
+                score *= scoring.freshness(self._published.get(article_id, float("nan")), now, half_life_days)
+            ranked.append((article_id, score))
+        return ranked
+
+
+class _Matrix:
+    """
+    Column-major (CSC) snapshot of the normalised TF-IDF rows. Each
+    column's postings are stored heaviest first, so a budgeted scan reads
+    the ones that matter most
+    """
+
+    def __init__(self, terms, categories, published, n_features):
+        ids = list(terms)
+        n = len(ids)
+        lengths = np.fromiter((len(terms[i][0]) for i in ids), np.int64, n)
+        cols = np.concatenate([terms[i][0] for i in ids]) if n else np.empty(0, np.int32)
+        tf = np.concatenate([terms[i][1] for i in ids]) if n else np.empty(0, np.float32)
+        rows = np.repeat(np.arange(n, dtype=np.int32), lengths)
+
+        df = np.bincount(cols, minlength=n_features)
+        self.idf = (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+        weights = tf * self.idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n))
+        norms[norms == 0] = 1.0
+        weights = (weights / norms[rows]).astype(np.float32)
+
+        order = np.lexsort((-weights, cols))
+        self.col_ptr = np.zeros(n_features + 1, np.int64)
+        np.cumsum(df, out=self.col_ptr[1:])
+        self.col_rows = rows[order]
+        self.col_weights = weights[order]
+
+        self.article_ids = np.array(ids, np.int64)
+        self.categories = np.array(
+            [-1 if categories.get(i) is None else categories[i] for i in ids], np.int64
+        )
+        self.published = np.array([published.get(i, np.nan) for i in ids], np.float64)
+        self.row_of = _RowIndex(self.article_ids)
+        self.stale = np.zeros(n, bool)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        matrix = cls.__new__(cls)
+        matrix.idf = snapshot["idf"]
+        matrix.col_ptr = snapshot["col_ptr"]
+        matrix.col_rows = snapshot["col_rows"]
+        matrix.col_weights = snapshot["col_weights"]
+        matrix.article_ids = snapshot["article_ids"]
+        matrix.categories = snapshot["category_ids"]
+        matrix.published = snapshot["published_seconds"]
+        matrix.row_of = _RowIndex(matrix.article_ids, snapshot["id_sorted"], snapshot["id_rows"])
+        matrix.stale = np.zeros(len(matrix.article_ids), bool)
+        return matrix
+
+    def product(self, q_cols, q_vals):
+        """
+        Cosine similarity of every row with the sparse query (q_cols, q_vals)
+        """
+        n = len(self.article_ids)
+        starts = self.col_ptr[q_cols]
+        lengths = self.col_ptr[q_cols + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(n, np.float64)
+        # Positions of every posting of the query's columns in col_rows/col_weights
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        return np.bincount(
+            self.col_rows[positions],
+            weights=self.col_weights[positions] * np.repeat(q_vals, lengths),
+            minlength=n
+        )
+
+
+    def top_rows(self, q_cols, q_vals, budget, k):
+        """
+        Rows of the k best partial scores against the sparse query, reading
+        about budget postings. Each query term gets a share of the budget in
+        proportion to its largest possible contribution (query weight x its
+        heaviest posting) and reads that many of its heaviest postings
+        """
+        starts = self.col_ptr[q_cols]
+        lengths = self.col_ptr[q_cols + 1] - starts
+        if k <= 0 or not lengths.any():
+            return np.empty(0, np.int64)
+        heaviest = np.where(lengths > 0, self.col_weights[np.minimum(starts, len(self.col_weights) - 1)], 0.0)
+        impact = np.abs(q_vals) * heaviest
+        if not impact.any():
+            return np.empty(0, np.int64)
+        lengths = np.minimum(lengths, np.ceil(budget * impact / impact.sum()).astype(np.int64))
+        total = int(lengths.sum())
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        # Accumulate over the touched rows only, so the cost does not grow with the catalog
+        rows, inverse = np.unique(self.col_rows[positions], return_inverse=True)
+        partial = np.bincount(inverse, weights=self.col_weights[positions] * np.repeat(q_vals, lengths))
+        partial[self.stale[rows]] = -np.inf
+        k = min(k, len(rows))
+        best = np.argpartition(-partial, k - 1)[:k]
+        return rows[best[np.isfinite(partial[best])]]
+
+
+class _RowIndex:
+    """
+    article_id -> row through a sorted copy of the ids, a dict's .get()
+    at 16 bytes per article
+    """
+
+    def __init__(self, article_ids, ids=None, rows=None):
+        if rows is None:
+            rows = np.argsort(article_ids, kind="stable")
+            ids = article_ids[rows]
+        self.ids = ids
+        self.rows = rows
+
+    def get(self, article_id, default=None):
+        i = int(np.searchsorted(self.ids, article_id))
+        if i < len(self.ids) and self.ids[i] == article_id:
+            return int(self.rows[i])
+        return default
+
+
+class _Overlay(MutableMapping):
+    """
+    article_id -> value over the rows of a snapshot: reads of untouched
+    articles go to value_of(row), writes and removals stay in memory
+    """
+
+    def __init__(self, row_of, value_of):
+        self._row_of = row_of
+        self._value_of = value_of
+        self._changed = {}
+        self._hidden = set()   # snapshot ids that were overwritten or removed
+
+    def __getitem__(self, article_id):
+        if article_id in self._changed:
+            return self._changed[article_id]
+        if article_id not in self._hidden:
+            row = self._row_of.get(article_id)
+            if row is not None:
+                return self._value_of(row)
+        raise KeyError(article_id)
+
+    def __contains__(self, article_id):
+        return article_id in self._changed or (
+            article_id not in self._hidden and self._row_of.get(article_id) is not None
+        )
+
+    def __setitem__(self, article_id, value):
+        self._changed[article_id] = value
+        if self._row_of.get(article_id) is not None:
+            self._hidden.add(article_id)
+
+    def __delitem__(self, article_id):
+        if article_id in self._changed:
+            del self._changed[article_id]
+        elif article_id not in self._hidden and self._row_of.get(article_id) is not None:
+            self._hidden.add(article_id)
+        else:
+            raise KeyError(article_id)
+
+    def __iter__(self):
+        for article_id in self._row_of.ids.tolist():
+            if article_id not in self._hidden:
+                yield article_id
+        yield from self._changed
+
+    def __len__(self):
+        return len(self._row_of.ids) - len(self._hidden) + len(self._changed)
+
+
+def _lookup(mapping, keys):
+    """
+    Vectorised mapping.get(key, 0.0) over an int array of keys
+    """
+    known = np.array(sorted(k for k in mapping if k is not None), np.int64)
+    if not len(known):
+        return np.zeros(len(keys), np.float64)
+    values = np.array([mapping[k] for k in known.tolist()], np.float64)
+    pos = np.clip(np.searchsorted(known, keys), 0, len(known) - 1)
+    return np.where(known[pos] == keys, values[pos], 0.0)
+
+
+def _top(article_ids, scores, top_n):
+    if top_n <= 0 or len(scores) == 0:
+        return []
+    k = min(top_n, len(scores))
+    best = np.argpartition(-scores, k - 1)[:k]
+    return [
+        (int(article_ids[i]), float(scores[i]))
+        for i in best if np.isfinite(scores[i])
+    ]
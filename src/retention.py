@@ -0,0 +1,74 @@
+# src/retention.py
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------
+# RETENTION SWEEPER
+# ------------------------
+class RetentionSweeper:
+    """
+    Deletes expired rows from a background thread every interval seconds
+    through expire_fn(before, limit), which removes at most limit rows
+    older than the before datetime (or otherwise expired) and returns a
+    result whose .data is the number deleted. A sweep repeats full batches
+    until a short one, so no single delete holds locks for long.
+    max_age_days=0 expires nothing by age.
+    """
+
+    def __init__(self, expire_fn, max_age_days=30, interval=3600, batch_size=1000):
+        self.expire_fn = expire_fn
+        self.max_age_days = max_age_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopping = threading.Event()
+        self._thread = None
+        self.deleted = 0
+        self.failures = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=30.0):
+        """
+        Stop after the batch in progress
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._stopping.clear()
+
+    def sweep(self):
+        """
+        Delete everything expired now; returns the number of rows deleted
+        """
+        if self.max_age_days:
+            before = datetime.now(timezone.utc) - timedelta(days=self.max_age_days)
+        else:
+            before = datetime.min.replace(tzinfo=timezone.utc)
+        total = 0
+        while not self._stopping.is_set():
+            deleted = self.expire_fn(before, self.batch_size).data or 0
+            total += deleted
+            if deleted < self.batch_size:
+                break
+        self.deleted += total
+        return total
+
+    # ----- internal -----
+    def _run(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception:
+                self.failures += 1
+                logger.exception("retention: sweep failed")
+            if self._stopping.wait(self.interval):
+                return
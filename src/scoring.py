@@ -0,0 +1,76 @@
+# src/scoring.py
+import heapq
+import json
+import os
+import time
+from datetime import datetime, timezone
+from operator import itemgetter
+
+import numpy as np
+
+# ------------------------
+# INTERACTION WEIGHTS
+# ------------------------
+# How much one interaction of each type adds to a profile; negative types
+# push the profile away from the article's category and terms. Override
+# with INTERACTION_WEIGHTS='{"like": 2.5, "hide": -3}'
+INTERACTION_WEIGHTS = {
+    "view": 0.5,
+    "click": 1.0,
+    "like": 3.0,
+    "bookmark": 3.0,
+    "share": 4.0,
+    "dislike": -4.0,
+}
+INTERACTION_WEIGHTS.update(json.loads(os.getenv("INTERACTION_WEIGHTS", "{}")))
+DEFAULT_INTERACTION_WEIGHT = float(os.getenv("DEFAULT_INTERACTION_WEIGHT", "1.0"))
+
+def interaction_weight(interaction_type):
+    return INTERACTION_WEIGHTS.get((interaction_type or "").lower(), DEFAULT_INTERACTION_WEIGHT)
+
+
+# ------------------------
+# ARTICLE FRESHNESS
+# ------------------------
+# An article's score halves every ARTICLE_HALF_LIFE_DAYS since it was
+# published; 0 turns freshness off. Interaction recency is handled by the
+# profile's own decay (PROFILE_HALF_LIFE_DAYS in src/profiles.py)
+ARTICLE_HALF_LIFE_DAYS = float(os.getenv("ARTICLE_HALF_LIFE_DAYS", "14"))
+
+def to_epoch(value):
+    """
+    Seconds since the epoch of a timestamp string or datetime, NaN if unknown
+    """
+    if not value:
+        return float("nan")
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return float("nan")
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc).timestamp()
+    return value.timestamp()
+
+def freshness(published, now=None, half_life_days=ARTICLE_HALF_LIFE_DAYS):
+    """
+    Decay factor in (0, 1] for articles published at the given epoch
+    seconds (a float or an array). Unknown and future times count as new
+    """
+    if not half_life_days:
+        return np.ones_like(published, np.float64) if isinstance(published, np.ndarray) else 1.0
+    age = (time.time() if now is None else now) - np.asarray(published, np.float64)
+    age_days = np.nan_to_num(np.maximum(age, 0.0) / 86400.0, nan=0.0)
+    factor = 0.5 ** (age_days / half_life_days)
+    return factor if isinstance(published, np.ndarray) else float(factor)
+
+
+# ------------------------
+# TOP-N SELECTION
+# ------------------------
+def top_n(scored, n):
+    """
+    The n highest-scoring (article_id, score) pairs, best first, keeping
+    only n in a heap instead of sorting every candidate
+    """
+    return heapq.nlargest(n, scored, key=itemgetter(1))
@@ -0,0 +1,196 @@
+# src/snapshot.py
+"""
+On-disk snapshot of the article catalog and TF-IDF vectors.
+
+    python -m src.snapshot --path catalog.snap
+    python -m src.snapshot --path catalog.snap --interval 600
+
+The builder reads and vectorizes every article once and writes article ids,
+category ids, publish times, the catalog's sorted indexes, the term vectors
+and the ranking matrix as raw arrays. Workers started with SNAPSHOT_PATH
+map the file read-only instead of loading from the database, so they start
+in milliseconds and share one copy of those pages through the page cache.
+
+File layout: an 8-byte magic, the header length, a JSON header (format
+version, build metadata and each array's dtype, shape and offset), then
+the arrays, each 64-byte aligned. A new snapshot is written to a temporary
+file and renamed over the old one, so a reader opens either the old or the
+new file, never a partial one, and keeps its old mapping until it swaps.
+"""
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.catalog import ArticleCatalog
+from src.ranking import RankingEngine
+
+MAGIC = b"NEWSSNAP"
+FORMAT_VERSION = 1
+ALIGN = 64
+
+_LENGTH = struct.Struct("<Q")
+
+
+# ------------------------
+# READING
+# ------------------------
+class Snapshot:
+    """
+    A snapshot file mapped read-only; snapshot[name] is a read-only NumPy
+    view of one array, meta the builder's metadata and version its build
+    number. The mapping stays open while any of the arrays is referenced.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        (length,) = _LENGTH.unpack_from(self._map, len(MAGIC))
+        start = len(MAGIC) + _LENGTH.size
+        header = json.loads(self._map[start:start + length])
+        if header["format"] != FORMAT_VERSION:
+            raise ValueError(f"{path} has snapshot format {header['format']}, expected {FORMAT_VERSION}")
+
+        self.meta = header["meta"]
+        self.version = self.meta["version"]
+        data = _aligned(start + length)
+        self._arrays = {
+            name: np.frombuffer(
+                self._map, dtype=spec["dtype"], count=math.prod(spec["shape"]), offset=data + spec["offset"]
+            ).reshape(spec["shape"])
+            for name, spec in header["arrays"].items()
+        }
+
+    def __getitem__(self, name):
+        return self._arrays[name]
+
+    def __contains__(self, name):
+        return name in self._arrays
+
+    def __len__(self):
+        return self.meta["articles"]
+
+def open_if_changed(path, current=None):
+    """
+    The snapshot at path, or None when there is none or it is the file current was opened from
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if current is not None and (stat.st_ino, stat.st_mtime_ns) == current.identity:
+        return None
+    return Snapshot(path)
+
+
+# ------------------------
+# WRITING
+# ------------------------
+def write(path, arrays, meta):
+    """
+    Write arrays ({name: ndarray}) and meta (JSON-serialisable) to path,
+    replacing any existing snapshot atomically
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    specs, offset = {}, 0
+    for name, array in arrays.items():
+        specs[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({"format": FORMAT_VERSION, "meta": meta, "arrays": specs}).encode()
+    data = _aligned(len(MAGIC) + _LENGTH.size + len(header))
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data + specs[name]["offset"])
+            f.write(array.data)
+        f.truncate(data + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def build(path, articles):
+    """
+    Vectorize articles (rows with the "text" view's columns) and write
+    them to path as one snapshot. Returns its metadata
+    """
+    meta_rows = []
+
+    def text_rows():
+        for article in articles:
+            meta_rows.append({
+                "article_id": article["article_id"],
+                "category_id": article.get("category_id"),
+                "published_at": article.get("published_at"),
+            })
+            yield article
+
+    engine = RankingEngine()
+    engine.load(text_rows())
+    catalog = ArticleCatalog()
+    catalog.load(meta_rows)
+
+    # Both share the id, category and id-index arrays, so their rows must line up
+    arrays = catalog.snapshot_arrays()
+    for name, array in engine.snapshot_arrays().items():
+        if name in arrays and not np.array_equal(arrays[name], array):
+            raise RuntimeError(f"catalog and ranking engine disagree on {name}")
+        arrays[name] = array
+
+    meta = {
+        "version": time.time_ns() // 1000,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "articles": len(meta_rows),
+        "watermark": catalog.watermark,
+        "n_features": engine.n_features,
+    }
+    write(path, arrays, meta)
+    return meta
+
+
+# ------------------------
+# HELPERS
+# ------------------------
+def _aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+# ------------------------
+# ENTRY POINT
+# ------------------------
+def main(argv=None):
+    from src.db import iter_articles
+
+    parser = argparse.ArgumentParser(description="Write the catalog and vector snapshot workers map at startup")
+    parser.add_argument("--path", default=os.getenv("SNAPSHOT_PATH", "catalog.snap"))
+    parser.add_argument("--interval", type=float, default=0, help="rebuild every this many seconds; 0 builds once")
+    args = parser.parse_args(argv)
+
+    while True:
+        t0 = time.perf_counter()
+        meta = build(args.path, (article for rows in iter_articles(fields="text") for article in rows))
+        print(json.dumps({**meta, "seconds": round(time.perf_counter() - t0, 3)}), flush=True)
+        if not args.interval:
+            return
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
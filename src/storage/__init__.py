@@ -0,0 +1,18 @@
+# src/storage/__init__.py
+import os
+
+from src.storage.base import StorageBackend, Result
+
+def create_backend(name=None):
+    """
+    Build the storage backend named by STORAGE_BACKEND ("supabase" or "sqlite").
+    Backends are imported on demand so each only needs its own client library
+    """
+    name = name or os.getenv("STORAGE_BACKEND", "supabase")
+    if name == "supabase":
+        from src.storage.supabase_backend import SupabaseBackend
+        return SupabaseBackend()
+    if name == "sqlite":
+        from src.storage.sqlite_backend import SQLiteBackend
+        return SQLiteBackend()
+    raise ValueError(f"Unknown storage backend: {name}")
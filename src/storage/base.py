@@ -0,0 +1,183 @@
+# src/storage/base.py
+
+
+class Result:
+    """
+    Query result with the same shape as a supabase APIResponse for the
+    fields the app reads
+    """
+
+    __slots__ = ("data", "count")
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+# ------------------------
+# STORAGE INTERFACE
+# ------------------------
+class StorageBackend:
+    """
+    Every table operation src.db needs. Methods return an object with a
+    .data list of row dicts. Article reads take a select list (see
+    src.db.ARTICLE_VIEWS) rather than a view name, and the keyset-paged
+    reads return one page so src.db can share the paging loops.
+    """
+
+    name = None
+
+    def close(self):
+        """
+        Release connections held by this backend
+        """
+
+    # ----- users -----
+    def create_user(self, username):
+        raise NotImplementedError
+
+    def get_user(self, user_id):
+        raise NotImplementedError
+
+    def update_user(self, user_id, username):
+        raise NotImplementedError
+
+    def delete_user(self, user_id):
+        raise NotImplementedError
+
+    def get_user_ids_page(self, limit, after=None, end_id=None):
+        """
+        user_id rows in ascending order with after < user_id < end_id
+        """
+        raise NotImplementedError
+
+    # ----- categories -----
+    def create_category(self, name):
+        raise NotImplementedError
+
+    def get_all_categories(self):
+        raise NotImplementedError
+
+    def update_category(self, category_id, name):
+        raise NotImplementedError
+
+    def delete_category(self, category_id):
+        raise NotImplementedError
+
+    # ----- articles -----
+    def create_articles(self, articles):
+        raise NotImplementedError
+
+    def get_all_articles(self, columns):
+        raise NotImplementedError
+
+    def get_articles_page(self, limit, after, columns):
+        """
+        Articles newest first, strictly after the (published_at, article_id) key
+        """
+        raise NotImplementedError
+
+    def get_articles_by_ids(self, article_ids, columns):
+        raise NotImplementedError
+
+    def get_articles_after(self, after_id, limit, columns):
+        """
+        Articles in article_id order, strictly after after_id (None for the start)
+        """
+        raise NotImplementedError
+
+    def update_article(self, article_id, values):
+        raise NotImplementedError
+
+    def delete_article(self, article_id):
+        raise NotImplementedError
+
+    # ----- interactions -----
+    def add_interactions(self, interactions):
+        raise NotImplementedError
+
+    def get_user_interactions(self, user_id):
+        raise NotImplementedError
+
+    def get_user_interacted_article_ids(self, user_id):
+        """
+        article_id, interaction_type and interaction_time of each of the user's interactions
+        """
+        raise NotImplementedError
+
+    def get_interactions_page(self, user_ids, limit, after=None):
+        """
+        Interactions of user_ids in interaction_id order, strictly after the given id
+        """
+        raise NotImplementedError
+
+    def get_interactions_since(self, since, limit, after=None):
+        """
+        Interactions at or after the since datetime in interaction_id order,
+        strictly after the given id
+        """
+        raise NotImplementedError
+
+    def update_interaction(self, interaction_id, interaction_type):
+        raise NotImplementedError
+
+    def delete_interaction(self, interaction_id):
+        raise NotImplementedError
+
+    # ----- user profiles -----
+    def get_user_profiles(self, user_ids):
+        raise NotImplementedError
+
+    def insert_user_profiles(self, profiles):
+        """
+        Insert profiles of users that have none yet; returns the rows inserted
+        """
+        raise NotImplementedError
+
+    def update_user_profile(self, profile, version):
+        """
+        Write profile and bump its version if the stored version is still
+        version; returns the row written, none when another write got there first
+        """
+        raise NotImplementedError
+
+    # ----- recommendations -----
+    def add_recommendation(self, user_id, article_id, score):
+        raise NotImplementedError
+
+    def upsert_recommendations(self, user_id, recommendations):
+        raise NotImplementedError
+
+    def upsert_recommendations_bulk(self, recommendations):
+        raise NotImplementedError
+
+    def get_recommendations(self, user_id):
+        raise NotImplementedError
+
+    def update_recommendation(self, recommendation_id, score):
+        raise NotImplementedError
+
+    def delete_recommendation(self, recommendation_id):
+        raise NotImplementedError
+
+    def expire_recommendations(self, before, limit):
+        """
+        Delete up to limit recommendations that a newer generation of the
+        same user superseded or that were made before the before datetime.
+        .data is the number of rows deleted
+        """
+        raise NotImplementedError
+
+    # ----- joined reads -----
+    def get_user_recommended_articles(self, user_id, columns, limit=None):
+        """
+        {score, recommended_at, Articles: {...}} rows of the user's newest
+        generation (the rows sharing the latest recommended_at), best score first
+        """
+        raise NotImplementedError
+
+    def get_user_interactions_with_articles(self, user_id, columns):
+        """
+        {interaction_type, interaction_time, Articles: {...}} rows for the user
+        """
+        raise NotImplementedError
@@ -0,0 +1,502 @@
+# src/storage/sqlite_backend.py
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from src.storage.base import StorageBackend, Result
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", "newsfeed.db")
+
+_NOW = "(strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))"
+
+# Same tables as the Supabase project plus the indexes the hot reads need
+SCHEMA = f"""
+create table if not exists "Users" (
+    user_id integer primary key,
+    username text not null,
+    created_at text not null default {_NOW}
+);
+
+create table if not exists "Categories" (
+    category_id integer primary key,
+    name text not null
+);
+
+create table if not exists "Articles" (
+    article_id integer primary key,
+    title text not null,
+    content text,
+    source text,
+    url text,
+    category_id integer references "Categories" (category_id) on delete set null,
+    published_at text,
+    created_at text not null default {_NOW}
+);
+create index if not exists articles_published_idx on "Articles" (published_at desc, article_id desc);
+create index if not exists articles_category_idx on "Articles" (category_id, published_at desc);
+
+create table if not exists "User_Interactions" (
+    interaction_id integer primary key,
+    user_id integer not null references "Users" (user_id) on delete cascade,
+    article_id integer not null references "Articles" (article_id) on delete cascade,
+    interaction_type text not null,
+    interaction_time text not null default {_NOW}
+);
+create index if not exists interactions_user_idx on "User_Interactions" (user_id, interaction_id);
+create index if not exists interactions_article_idx on "User_Interactions" (article_id);
+create index if not exists interactions_time_idx on "User_Interactions" (interaction_time);
+
+create table if not exists "User_Profiles" (
+    user_id integer primary key references "Users" (user_id) on delete cascade,
+    category_weights text not null default '{{}}',
+    term_weights text not null default '{{}}',
+    updated_at text not null default {_NOW},
+    version integer not null default 0
+);
+
+create table if not exists "Recommendations" (
+    recommendation_id integer primary key,
+    user_id integer not null references "Users" (user_id) on delete cascade,
+    article_id integer not null references "Articles" (article_id) on delete cascade,
+    score real,
+    recommended_at text not null default {_NOW},
+    unique (user_id, article_id)
+);
+-- Newest generation of a user, best first; and the retention sweep by age
+create index if not exists recommendations_user_latest_idx on "Recommendations" (user_id, recommended_at desc, score desc);
+create index if not exists recommendations_time_idx on "Recommendations" (recommended_at);
+"""
+
+COLUMNS = {
+    "Users": ("user_id", "username", "created_at"),
+    "Categories": ("category_id", "name"),
+    "Articles": ("article_id", "title", "content", "source", "url", "category_id", "published_at", "created_at"),
+    "User_Interactions": ("interaction_id", "user_id", "article_id", "interaction_type", "interaction_time"),
+    "User_Profiles": ("user_id", "category_weights", "term_weights", "updated_at", "version"),
+    "Recommendations": ("recommendation_id", "user_id", "article_id", "score", "recommended_at"),
+}
+
+_JSON_COLUMNS = ("category_weights", "term_weights")
+
+# Stored as fixed-width UTC ISO strings so ordering and keyset comparisons
+# by string match ordering by time
+_TIME_COLUMNS = ("published_at",)
+_UTC_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]T[0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]+00:00"
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Embedded storage in one SQLite file in WAL mode, so readers never block
+    the writer. Each thread (and each forked process) opens its own
+    connection; path must be a file, not ":memory:".
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+        self._add_missing_columns()
+        self._normalize_times()
+
+    # ----- connections -----
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.row_factory = _dict_row
+            conn.execute("pragma journal_mode = wal")
+            conn.execute("pragma synchronous = normal")
+            conn.execute("pragma foreign_keys = on")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("begin immediate")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("rollback")
+            raise
+        conn.execute("commit")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _add_missing_columns(self):
+        # Files created before User_Profiles had a version column
+        columns = {row["name"] for row in self._select('pragma table_info("User_Profiles")').data}
+        if "version" not in columns:
+            self._conn().execute('alter table "User_Profiles" add column version integer not null default 0')
+
+    def _normalize_times(self):
+        # Rewrite published_at values stored before they were normalized on write
+        rows = self._select(
+            'select article_id, published_at from "Articles" where published_at not glob ?', (_UTC_GLOB,)
+        ).data
+        updates = []
+        for row in rows:
+            try:
+                updates.append((_utc_iso(row["published_at"]), row["article_id"]))
+            except ValueError:
+                continue
+        if updates:
+            with self._transaction() as conn:
+                conn.executemany('update "Articles" set published_at = ? where article_id = ?', updates)
+
+    # ----- generic statements -----
+    def _select(self, sql, params=()):
+        return Result(self._conn().execute(sql, params).fetchall())
+
+    def _insert(self, table, rows):
+        if isinstance(rows, dict):
+            rows = [rows]
+        with self._transaction() as conn:
+            return Result([self._insert_row(conn, table, row) for row in rows])
+
+    def _insert_row(self, conn, table, row):
+        columns = _checked(table, row)
+        sql = (
+            f'insert into "{table}" ({", ".join(columns)}) '
+            f'values ({", ".join("?" * len(columns))}) returning *'
+        )
+        return conn.execute(sql, [_encode(c, row[c]) for c in columns]).fetchone()
+
+    def _update(self, table, values, key, key_value):
+        columns = _checked(table, values)
+        if not columns:
+            return self._select(f'select * from "{table}" where {key} = ?', (key_value,))
+        sql = f'update "{table}" set {", ".join(f"{c} = ?" for c in columns)} where {key} = ? returning *'
+        with self._transaction() as conn:
+            return Result(conn.execute(sql, [_encode(c, values[c]) for c in columns] + [key_value]).fetchall())
+
+    def _delete(self, table, key, key_value):
+        with self._transaction() as conn:
+            return Result(conn.execute(f'delete from "{table}" where {key} = ? returning *', (key_value,)).fetchall())
+
+    def bulk_load(self, table, rows):
+        """
+        Insert rows with their ids as given in one transaction, e.g. to seed
+        a database; skips RETURNING and change notifications
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        columns = _checked(table, rows[0])
+        sql = f'insert into "{table}" ({", ".join(columns)}) values ({", ".join("?" * len(columns))})'
+        with self._transaction() as conn:
+            conn.executemany(sql, ([_encode(c, row[c]) for c in columns] for row in rows))
+
+    # ------------------------
+    # USERS
+    # ------------------------
+    def create_user(self, username):
+        return self._insert("Users", {"username": username})
+
+    def get_user(self, user_id):
+        return self._select('select * from "Users" where user_id = ?', (user_id,))
+
+    def update_user(self, user_id, username):
+        return self._update("Users", {"username": username}, "user_id", user_id)
+
+    def delete_user(self, user_id):
+        return self._delete("Users", "user_id", user_id)
+
+    def get_user_ids_page(self, limit, after=None, end_id=None):
+        return self._select(
+            'select user_id from "Users" where user_id > ? and user_id < ? order by user_id limit ?',
+            (-2 ** 63 if after is None else after, 2 ** 63 - 1 if end_id is None else end_id, limit)
+        )
+
+    # ------------------------
+    # CATEGORIES
+    # ------------------------
+    def create_category(self, name):
+        return self._insert("Categories", {"name": name})
+
+    def get_all_categories(self):
+        return self._select('select * from "Categories"')
+
+    def update_category(self, category_id, name):
+        return self._update("Categories", {"name": name}, "category_id", category_id)
+
+    def delete_category(self, category_id):
+        return self._delete("Categories", "category_id", category_id)
+
+    # ------------------------
+    # ARTICLES
+    # ------------------------
+    def create_articles(self, articles):
+        return self._insert("Articles", articles)
+
+    def get_all_articles(self, columns):
+        return self._select(f'select {_select_list("Articles", columns)} from "Articles"')
+
+    def get_articles_page(self, limit, after, columns):
+        select = f'select {_select_list("Articles", columns)} from "Articles"'
+        order = "order by published_at desc, article_id desc limit ?"
+        if after:
+            published_at, article_id = after
+            return self._select(
+                f"{select} where (published_at, article_id) < (?, ?) {order}",
+                (_utc_iso(published_at), article_id, limit)
+            )
+        return self._select(f"{select} {order}", (limit,))
+
+    def get_articles_by_ids(self, article_ids, columns):
+        return self._select(
+            f'select {_select_list("Articles", columns)} from "Articles" '
+            "where article_id in (select value from json_each(?))",
+            (json.dumps(list(article_ids)),)
+        )
+
+    def get_articles_after(self, after_id, limit, columns):
+        return self._select(
+            f'select {_select_list("Articles", columns)} from "Articles" '
+            "where article_id > ? order by article_id limit ?",
+            (-2 ** 63 if after_id is None else after_id, limit)
+        )
+
+    def update_article(self, article_id, values):
+        return self._update("Articles", values, "article_id", article_id)
+
+    def delete_article(self, article_id):
+        return self._delete("Articles", "article_id", article_id)
+
+    # ------------------------
+    # USER INTERACTIONS
+    # ------------------------
+    def add_interactions(self, interactions):
+        return self._insert("User_Interactions", interactions)
+
+    def get_user_interactions(self, user_id):
+        return self._select('select * from "User_Interactions" where user_id = ?', (user_id,))
+
+    def get_user_interacted_article_ids(self, user_id):
+        return self._select(
+            'select article_id, interaction_type, interaction_time from "User_Interactions" where user_id = ?',
+            (user_id,)
+        )
+
+    def get_interactions_page(self, user_ids, limit, after=None):
+        return self._select(
+            "select interaction_id, user_id, article_id, interaction_type, interaction_time "
+            'from "User_Interactions" '
+            "where user_id in (select value from json_each(?)) and interaction_id > ? "
+            "order by interaction_id limit ?",
+            (json.dumps(list(user_ids)), -2 ** 63 if after is None else after, limit)
+        )
+
+    def get_interactions_since(self, since, limit, after=None):
+        return self._select(
+            "select interaction_id, user_id, article_id, interaction_type, interaction_time "
+            'from "User_Interactions" '
+            "where interaction_time >= ? and interaction_id > ? "
+            "order by interaction_id limit ?",
+            (
+                since.astimezone(timezone.utc).isoformat(timespec="milliseconds"),
+                -2 ** 63 if after is None else after, limit
+            )
+        )
+
+    def update_interaction(self, interaction_id, interaction_type):
+        return self._update("User_Interactions", {"interaction_type": interaction_type}, "interaction_id", interaction_id)
+
+    def delete_interaction(self, interaction_id):
+        return self._delete("User_Interactions", "interaction_id", interaction_id)
+
+    # ------------------------
+    # USER PROFILES
+    # ------------------------
+    def get_user_profiles(self, user_ids):
+        result = self._select(
+            'select * from "User_Profiles" where user_id in (select value from json_each(?))',
+            (json.dumps(list(user_ids)),)
+        )
+        result.data = [_decode(row) for row in result.data]
+        return result
+
+    def insert_user_profiles(self, profiles):
+        rows = []
+        with self._transaction() as conn:
+            for profile in profiles:
+                columns = _checked("User_Profiles", profile)
+                sql = (
+                    f'insert into "User_Profiles" ({", ".join(columns)}) '
+                    f'values ({", ".join("?" * len(columns))}) on conflict (user_id) do nothing returning *'
+                )
+                row = conn.execute(sql, [_encode(c, profile[c]) for c in columns]).fetchone()
+                if row is not None:
+                    rows.append(_decode(row))
+        return Result(rows)
+
+    def update_user_profile(self, profile, version):
+        values = {**profile, "version": version + 1}
+        columns = [c for c in _checked("User_Profiles", values) if c != "user_id"]
+        sql = (
+            f'update "User_Profiles" set {", ".join(f"{c} = ?" for c in columns)} '
+            "where user_id = ? and version = ? returning *"
+        )
+        with self._transaction() as conn:
+            rows = conn.execute(
+                sql, [_encode(c, values[c]) for c in columns] + [profile["user_id"], version]
+            ).fetchall()
+        return Result([_decode(row) for row in rows])
+
+    # ------------------------
+    # RECOMMENDATIONS
+    # ------------------------
+    def add_recommendation(self, user_id, article_id, score):
+        return self._insert("Recommendations", {"user_id": user_id, "article_id": article_id, "score": score})
+
+    def upsert_recommendations(self, user_id, recommendations):
+        rows = [{"user_id": user_id, "article_id": r["article_id"], "score": r["score"]} for r in recommendations]
+        return self._replace_recommendations([user_id], rows)
+
+    def upsert_recommendations_bulk(self, recommendations):
+        return self._replace_recommendations({r["user_id"] for r in recommendations}, recommendations)
+
+    def _replace_recommendations(self, user_ids, rows):
+        # Same statements as replace_recommendations() in sql/recommendations.sql
+        payload = json.dumps([
+            {"user_id": r["user_id"], "article_id": r["article_id"], "score": r["score"]} for r in rows
+        ])
+        with self._transaction() as conn:
+            conn.execute(
+                'delete from "Recommendations" '
+                "where user_id in (select value from json_each(?)) "
+                "and (user_id, article_id) not in ("
+                "    select json_extract(value, '$.user_id'), json_extract(value, '$.article_id') from json_each(?))",
+                (json.dumps(list(user_ids)), payload)
+            )
+            return Result(conn.execute(
+                'insert into "Recommendations" (user_id, article_id, score, recommended_at) '
+                f"select json_extract(value, '$.user_id'), json_extract(value, '$.article_id'), json_extract(value, '$.score'), {_NOW} "
+                "from json_each(?) where true "
+                "on conflict (user_id, article_id) "
+                "do update set score = excluded.score, recommended_at = excluded.recommended_at "
+                "returning *",
+                (payload,)
+            ).fetchall())
+
+    def get_recommendations(self, user_id):
+        return self._select('select * from "Recommendations" where user_id = ?', (user_id,))
+
+    def update_recommendation(self, recommendation_id, score):
+        return self._update("Recommendations", {"score": score}, "recommendation_id", recommendation_id)
+
+    def delete_recommendation(self, recommendation_id):
+        return self._delete("Recommendations", "recommendation_id", recommendation_id)
+
+    def expire_recommendations(self, before, limit):
+        # Same statement as expire_recommendations() in sql/recommendations.sql
+        before = before.astimezone(timezone.utc).isoformat(timespec="milliseconds")
+        with self._transaction() as conn:
+            deleted = conn.execute(
+                'delete from "Recommendations" where recommendation_id in ('
+                '    select r.recommendation_id from "Recommendations" r '
+                "    where r.recommended_at < ? "
+                "       or r.recommended_at < ("
+                '           select max(l.recommended_at) from "Recommendations" l where l.user_id = r.user_id) '
+                "    limit ?)",
+                (before, limit)
+            ).rowcount
+        return Result(deleted)
+
+    # ------------------------
+    # JOINED READS
+    # ------------------------
+    def get_user_recommended_articles(self, user_id, columns, limit=None):
+        return self._embed_articles(
+            "Recommendations", ("score", "recommended_at"), columns, user_id,
+            "and t.recommended_at = ("
+            '    select max(recommended_at) from "Recommendations" where user_id = t.user_id) '
+            "order by t.score desc limit ?",
+            (-1 if limit is None else limit,)
+        )
+
+    def get_user_interactions_with_articles(self, user_id, columns):
+        return self._embed_articles(
+            "User_Interactions", ("interaction_type", "interaction_time"), columns, user_id
+        )
+
+    def _embed_articles(self, table, own_columns, columns, user_id, tail="", params=()):
+        # Rows shaped like a PostgREST embed: {own columns..., "Articles": {...}}
+        article_columns = _column_names("Articles", columns)
+        select = ", ".join([f"t.{c}" for c in own_columns] + [f"a.{c}" for c in article_columns])
+        cursor = self._conn().cursor()
+        cursor.row_factory = None
+        rows = cursor.execute(
+            f'select {select} from "{table}" t join "Articles" a on a.article_id = t.article_id '
+            f"where t.user_id = ? {tail}",
+            (user_id, *params)
+        ).fetchall()
+        n = len(own_columns)
+        return Result([
+            {**dict(zip(own_columns, row[:n])), "Articles": dict(zip(article_columns, row[n:]))}
+            for row in rows
+        ])
+
+
+# ------------------------
+# HELPERS
+# ------------------------
+def _checked(table, row):
+    """
+    Column names of row, refusing any the table doesn't have since they
+    are interpolated into SQL
+    """
+    allowed = COLUMNS[table]
+    columns = list(row)
+    unknown = [c for c in columns if c not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown {table} columns: {', '.join(unknown)}")
+    return columns
+
+def _column_names(table, columns):
+    if columns.strip() == "*":
+        return list(COLUMNS[table])
+    return _checked(table, {c.strip(): None for c in columns.split(",")})
+
+def _select_list(table, columns):
+    return ", ".join(_column_names(table, columns))
+
+def _encode(column, value):
+    if column in _TIME_COLUMNS:
+        return _utc_iso(value)
+    return json.dumps(value) if column in _JSON_COLUMNS and not isinstance(value, str) else value
+
+def _utc_iso(value):
+    """
+    value (an ISO string with any offset, "Z" or none for UTC, or a
+    datetime) as a fixed-width UTC ISO string; None stays None
+    """
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"Invalid timestamp: {value!r}") from None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+def _decode(row):
+    for column in _JSON_COLUMNS:
+        if isinstance(row.get(column), str):
+            row[column] = json.loads(row[column])
+    return row
@@ -0,0 +1,267 @@
+# src/storage/supabase_backend.py
+import os
+
+import httpx
+from supabase import create_client
+from supabase.lib.client_options import SyncClientOptions
+
+from src.storage.base import StorageBackend
+
+
+class SupabaseBackend(StorageBackend):
+    """
+    Storage on a Supabase (PostgREST) project; every call is one HTTP round
+    trip over a shared keep-alive connection pool
+    """
+
+    name = "supabase"
+
+    def __init__(self, url=None, key=None):
+        url = url or os.getenv("SUPABASE_URL")
+        key = key or os.getenv("SUPABASE_KEY")
+        if not url or not key:
+            raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set to use the supabase storage backend")
+        # Sized like the async DB pool so every worker thread can hold a connection
+        pool_size = int(os.getenv("DB_POOL_SIZE", "16"))
+        self.http = httpx.Client(
+            timeout=httpx.Timeout(float(os.getenv("SUPABASE_TIMEOUT", "30")), connect=5.0),
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size, keepalive_expiry=60.0
+            ),
+        )
+        self.client = create_client(url, key, options=SyncClientOptions(httpx_client=self.http))
+
+    def close(self):
+        self.http.close()
+
+    def _table(self, name):
+        return self.client.table(name)
+
+    # ------------------------
+    # USERS
+    # ------------------------
+    def create_user(self, username):
+        return self._table("Users").insert({
+            "username": username
+        }).execute()
+
+    def get_user(self, user_id):
+        return self._table("Users").select("*").eq("user_id", user_id).execute()
+
+    def update_user(self, user_id, username):
+        return self._table("Users").update({
+            "username": username
+        }).eq("user_id", user_id).execute()
+
+    def delete_user(self, user_id):
+        return self._table("Users").delete().eq("user_id", user_id).execute()
+
+    def get_user_ids_page(self, limit, after=None, end_id=None):
+        query = self._table("Users").select("user_id").order("user_id").limit(limit)
+        if after is not None:
+            query = query.gt("user_id", after)
+        if end_id is not None:
+            query = query.lt("user_id", end_id)
+        return query.execute()
+
+    # ------------------------
+    # CATEGORIES
+    # ------------------------
+    def create_category(self, name):
+        return self._table("Categories").insert({
+            "name": name
+        }).execute()
+
+    def get_all_categories(self):
+        return self._table("Categories").select("*").execute()
+
+    def update_category(self, category_id, name):
+        return self._table("Categories").update({
+            "name": name
+        }).eq("category_id", category_id).execute()
+
+    def delete_category(self, category_id):
+        return self._table("Categories").delete().eq("category_id", category_id).execute()
+
+    # ------------------------
+    # ARTICLES
+    # ------------------------
+    def create_articles(self, articles):
+        return self._table("Articles").insert(articles).execute()
+
+    def get_all_articles(self, columns):
+        return self._table("Articles").select(columns).execute()
+
+    def get_articles_page(self, limit, after, columns):
+        query = (
+            self._table("Articles")
+            .select(columns)
+            .order("published_at", desc=True)
+            .order("article_id", desc=True)
+            .limit(limit)
+        )
+        if after:
+            published_at, article_id = after
+            query = query.or_(
+                f'published_at.lt."{published_at}",'
+                f'and(published_at.eq."{published_at}",article_id.lt.{article_id})'
+            )
+        return query.execute()
+
+    def get_articles_by_ids(self, article_ids, columns):
+        return self._table("Articles").select(columns).in_("article_id", list(article_ids)).execute()
+
+    def get_articles_after(self, after_id, limit, columns):
+        query = self._table("Articles").select(columns).order("article_id").limit(limit)
+        if after_id is not None:
+            query = query.gt("article_id", after_id)
+        return query.execute()
+
+    def update_article(self, article_id, values):
+        return self._table("Articles").update(values).eq("article_id", article_id).execute()
+
+    def delete_article(self, article_id):
+        return self._table("Articles").delete().eq("article_id", article_id).execute()
+
+    # ------------------------
+    # USER INTERACTIONS
+    # ------------------------
+    def add_interactions(self, interactions):
+        return self._table("User_Interactions").insert(interactions).execute()
+
+    def get_user_interactions(self, user_id):
+        return self._table("User_Interactions").select("*").eq("user_id", user_id).execute()
+
+    def get_user_interacted_article_ids(self, user_id):
+        return (
+            self._table("User_Interactions")
+            .select("article_id, interaction_type, interaction_time")
+            .eq("user_id", user_id)
+            .execute()
+        )
+
+    def get_interactions_page(self, user_ids, limit, after=None):
+        query = (
+            self._table("User_Interactions")
+            .select("interaction_id, user_id, article_id, interaction_type, interaction_time")
+            .in_("user_id", list(user_ids))
+            .order("interaction_id")
+            .limit(limit)
+        )
+        if after is not None:
+            query = query.gt("interaction_id", after)
+        return query.execute()
+
+    def get_interactions_since(self, since, limit, after=None):
+        query = (
+            self._table("User_Interactions")
+            .select("interaction_id, user_id, article_id, interaction_type, interaction_time")
+            .gte("interaction_time", since.isoformat())
+            .order("interaction_id")
+            .limit(limit)
+        )
+        if after is not None:
+            query = query.gt("interaction_id", after)
+        return query.execute()
+
+    def update_interaction(self, interaction_id, interaction_type):
+        return self._table("User_Interactions").update({
+            "interaction_type": interaction_type
+        }).eq("interaction_id", interaction_id).execute()
+
+    def delete_interaction(self, interaction_id):
+        return self._table("User_Interactions").delete().eq("interaction_id", interaction_id).execute()
+
+    # ------------------------
+    # USER PROFILES
+    # ------------------------
+    def get_user_profiles(self, user_ids):
+        return self._table("User_Profiles").select("*").in_("user_id", list(user_ids)).execute()
+
+    def insert_user_profiles(self, profiles):
+        return (
+            self._table("User_Profiles")
+            .upsert(profiles, on_conflict="user_id", ignore_duplicates=True)
+            .execute()
+        )
+
+    def update_user_profile(self, profile, version):
+        return (
+            self._table("User_Profiles")
+            .update({**profile, "version": version + 1})
+            .eq("user_id", profile["user_id"])
+            .eq("version", version)
+            .execute()
+        )
+
+    # ------------------------
+    # RECOMMENDATIONS
+    # ------------------------
+    def add_recommendation(self, user_id, article_id, score):
+        return self._table("Recommendations").insert({
+            "user_id": user_id,
+            "article_id": article_id,
+            "score": score
+        }).execute()
+
+    def upsert_recommendations(self, user_id, recommendations):
+        # replace_recommendations() lives in sql/recommendations.sql
+        return self.client.rpc("replace_recommendations", {
+            "p_user_id": user_id,
+            "p_rows": recommendations
+        }).execute()
+
+    def upsert_recommendations_bulk(self, recommendations):
+        return self.client.rpc("replace_recommendations_bulk", {"p_rows": recommendations}).execute()
+
+    def get_recommendations(self, user_id):
+        return self._table("Recommendations").select("*").eq("user_id", user_id).execute()
+
+    def update_recommendation(self, recommendation_id, score):
+        return self._table("Recommendations").update({
+            "score": score
+        }).eq("recommendation_id", recommendation_id).execute()
+
+    def delete_recommendation(self, recommendation_id):
+        return self._table("Recommendations").delete().eq("recommendation_id", recommendation_id).execute()
+
+    def expire_recommendations(self, before, limit):
+        # expire_recommendations() lives in sql/recommendations.sql
+        return self.client.rpc("expire_recommendations", {
+            "p_before": before.isoformat(),
+            "p_limit": limit
+        }).execute()
+
+    # ------------------------
+    # JOINED READS
+    # ------------------------
+    def get_user_recommended_articles(self, user_id, columns, limit=None):
+        # Both reads walk recommendations_user_latest_idx
+        latest = (
+            self._table("Recommendations")
+            .select("recommended_at")
+            .eq("user_id", user_id)
+            .order("recommended_at", desc=True)
+            .limit(1)
+            .execute()
+        )
+        if not latest.data:
+            return latest
+        query = (
+            self._table("Recommendations")
+            .select(f"score, recommended_at, Articles({columns})")
+            .eq("user_id", user_id)
+            .eq("recommended_at", latest.data[0]["recommended_at"])
+            .order("score", desc=True)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return query.execute()
+
+    def get_user_interactions_with_articles(self, user_id, columns):
+        return (
+            self._table("User_Interactions")
+            .select(f"interaction_type, interaction_time, Articles({columns})")
+            .eq("user_id", user_id)
+            .execute()
+        )
@@ -0,0 +1,171 @@
+# src/trending.py
+import heapq
+import math
+import threading
+import time
+
+from src.scoring import interaction_weight, to_epoch, top_n
+
+
+# ------------------------
+# SLIDING WINDOW COUNTS
+# ------------------------
+class SlidingCounter:
+    """
+    Weighted counts per key over the last window seconds, kept in a ring
+    of buckets; a bucket's counts are subtracted from the totals when it
+    falls out of the window. At most capacity keys are tracked, each in
+    the totals plus at most one entry per bucket. When full, a new key
+    replaces the lowest total Space-Saving style, inheriting its count;
+    the lowest total is found through a lazy min-heap of (total, key)
+    whose stale entries are skipped on pop and compacted away.
+
+    top() reads a ranking of the top_size keys that is rebuilt at most
+    once a bucket or a minute, whichever is shorter, and lags new counts
+    by that much.
+    """
+
+    def __init__(self, window, buckets=60, capacity=10000, top_size=100):
+        self.window = window
+        self.bucket_seconds = window / buckets
+        self.capacity = capacity
+        self.top_size = top_size
+        self._ring = [{} for _ in range(buckets)]
+        self._totals = {}
+        self._heap = []     # (total, key), stale once the key's total has changed
+        self._head = None   # number of the newest bucket
+        self._top = None
+        self._top_at = None
+
+    def __len__(self):
+        return len(self._totals)
+
+    def add(self, key, weight, when):
+        self._advance(when)
+        bucket = int(when // self.bucket_seconds)
+        if bucket <= self._head - len(self._ring):
+            return
+        if key not in self._totals and len(self._totals) >= self.capacity:
+            weight += self._forget(self._weakest())
+        slot = self._ring[bucket % len(self._ring)]
+        slot[key] = slot.get(key, 0.0) + weight
+        self._set_total(key, self._totals.get(key, 0.0) + weight)
+
+    def top(self, k, now):
+        """
+        [(key, count)] of up to k keys with the highest counts, highest first
+        """
+        self._advance(now)
+        if self._top is None or now - self._top_at >= min(self.bucket_seconds, 60.0):
+            self._top = top_n(self._totals.items(), self.top_size)
+            self._top_at = now
+        return self._top[:k]
+
+    # ----- internal -----
+    def _advance(self, now):
+        bucket = int(now // self.bucket_seconds)
+        if self._head is None:
+            self._head = bucket
+            return
+        if bucket <= self._head:
+            return
+        for number in range(self._head + 1, min(bucket, self._head + len(self._ring)) + 1):
+            slot = self._ring[number % len(self._ring)]
+            for key, weight in slot.items():
+                total = self._totals[key] - weight
+                if total > 1e-9:
+                    self._set_total(key, total)
+                else:
+                    del self._totals[key]
+            slot.clear()
+        self._head = bucket
+
+    def _set_total(self, key, total):
+        self._totals[key] = total
+        heapq.heappush(self._heap, (total, key))
+        if len(self._heap) > 2 * len(self._totals) + 64:
+            self._heap = [(total, key) for key, total in self._totals.items()]
+            heapq.heapify(self._heap)
+
+    def _weakest(self):
+        while True:
+            total, key = heapq.heappop(self._heap)
+            if self._totals.get(key) == total:
+                return key
+
+    def _forget(self, key):
+        for slot in self._ring:
+            slot.pop(key, None)
+        return self._totals.pop(key)
+
+
+# ------------------------
+# TRENDING
+# ------------------------
+class Trending:
+    """
+    Positive interaction weight per article and per category over each
+    of windows ({name: seconds}). category_of(article_id) maps articles to
+    categories; interactions on articles it does not know only count for
+    the article.
+    """
+
+    def __init__(self, category_of, windows=None, buckets=60, capacity=10000, top_size=100):
+        self.category_of = category_of
+        self.windows = dict(windows or {"1h": 3600, "24h": 86400})
+        self.top_size = top_size
+        self._articles = {name: SlidingCounter(seconds, buckets, capacity, top_size)
+                          for name, seconds in self.windows.items()}
+        self._categories = {name: SlidingCounter(seconds, buckets, capacity, top_size)
+                            for name, seconds in self.windows.items()}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def ensure_loaded(self, loader):
+        """
+        Count the rows of loader(since) once, where since is the epoch
+        second at which the longest window starts
+        """
+        if self.loaded:
+            return self
+        with self._lock:
+            if not self.loaded:
+                since = time.time() - max(self.windows.values(), default=0)
+                self._add(loader(since), time.time())
+                self.loaded = True
+        return self
+
+    def add_interactions(self, rows):
+        """
+        Count interaction rows at their interaction_time, or now if they have none
+        """
+        with self._lock:
+            self._add(rows, time.time())
+
+    def top_articles(self, window, k):
+        """
+        [(article_id, weight)] of the k most interacted-with articles in window
+        """
+        with self._lock:
+            return self._articles[window].top(k, time.time())
+
+    def top_categories(self, window, k):
+        """
+        [(category_id, weight)] of the k most interacted-with categories in window
+        """
+        with self._lock:
+            return self._categories[window].top(k, time.time())
+
+    # ----- internal -----
+    def _add(self, rows, now):
+        for row in rows:
+            weight = interaction_weight(row.get("interaction_type"))
+            if weight <= 0:
+                continue
+            when = to_epoch(row.get("interaction_time"))
+            when = now if math.isnan(when) else min(when, now)
+            category_id = self.category_of(row["article_id"])
+            for name in self.windows:
+                self._articles[name].add(row["article_id"], weight, when)
+                if category_id is not None:
+                    self._categories[name].add(category_id, weight, when)
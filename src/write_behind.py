@@ -0,0 +1,144 @@
+# src/write_behind.py
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFull(Exception):
+    """Raised when the write-behind buffer is at capacity"""
+
+
+# ------------------------
+# WRITE-BEHIND BUFFER
+# ------------------------
+class WriteBehindBuffer:
+    """
+    Accepts rows immediately and writes them in the background with
+    flush_fn(rows), a batch at a time. A batch is flushed once it reaches
+    max_batch rows or flush_interval seconds after its first row arrived.
+    The buffer holds at most max_pending rows; put() raises BufferFull
+    beyond that so callers can shed load. Subscribers get every flushed
+    batch, so incremental consumers never re-read the table.
+
+    A batch that still fails after retries attempts is split in halves and
+    each half written on its own, down to single rows, so one bad row only
+    costs itself; rows that fail alone are logged and kept in dead_letters
+    (the last dead_letter_size of them).
+    """
+
+    def __init__(self, flush_fn, max_batch=500, flush_interval=1.0, max_pending=10000, retries=3,
+                 dead_letter_size=1000):
+        self.flush_fn = flush_fn
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._subscribers = []
+        self._stopping = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.dead_letters = deque(maxlen=dead_letter_size)
+        self.flushed = 0
+        self.dropped = 0
+
+    def subscribe(self, callback):
+        """
+        Register callback(rows), called after each batch is written
+        """
+        self._subscribers.append(callback)
+
+    def put(self, row):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            raise BufferFull("write-behind buffer is full")
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def close(self, timeout=30.0):
+        """
+        Flush every queued row, then stop the flusher thread
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._stopping.clear()
+
+    # ----- internal -----
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=0.1 if self._stopping.is_set() else self.flush_interval)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    # While draining on shutdown don't wait for stragglers
+                    if self._stopping.is_set() or remaining <= 0:
+                        batch.append(self._queue.get_nowait())
+                    else:
+                        batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        for attempt in range(self.retries):
+            try:
+                self.flush_fn(batch)
+                written = batch
+                break
+            except Exception as exc:
+                if attempt == self.retries - 1:
+                    logger.exception("write-behind: batch of %d rows failed %d times, writing it in parts",
+                                     len(batch), self.retries)
+                    written = self._bisect(batch, exc)
+                else:
+                    time.sleep(0.5 * 2 ** attempt)
+        if not written:
+            return
+        self.flushed += len(written)
+        for callback in self._subscribers:
+            try:
+                callback(written)
+            except Exception:
+                logger.exception("write-behind: subscriber %r failed", callback)
+
+    def _bisect(self, batch, error):
+        # Write each half of a failed batch on its own, down to single rows;
+        # returns the rows that were written
+        if len(batch) == 1:
+            self.dropped += 1
+            self.dead_letters.append(batch[0])
+            logger.error("write-behind: dropped row %r", batch[0], exc_info=error)
+            return []
+        middle = len(batch) // 2
+        written = []
+        for half in (batch[:middle], batch[middle:]):
+            try:
+                self.flush_fn(half)
+                written.extend(half)
+            except Exception as exc:
+                written.extend(self._bisect(half, exc))
+        return written